@@ -6,9 +6,62 @@ Supports hybrid mode: saves first N frames as PNGs for inspection/reporting
 
 import cv2
 import os
-import numpy as np
+import torch
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 
+from .video_io import AsyncFrameWriter, FrameReader, open_video, open_video_writer
+
+# Fast zlib level for report PNGs: ~3x faster encode for slightly larger files
+PNG_WRITE_PARAMS = [cv2.IMWRITE_PNG_COMPRESSION, 1]
+
+
+def _half_blend(img0, img1):
+    """
+    50/50 blend of two uint8 frames
+    
+    cv2.addWeighted already runs SIMD fixed-point math directly on uint8 and
+    rounds half-to-even; at 1080p it measured ~11x faster than the NumPy
+    (a.astype(uint16) + b) >> 1 formulation, so it is kept as the kernel.
+    """
+    return cv2.addWeighted(img0, 0.5, img1, 0.5, 0)
+
+
+# Frames are compared at this size by the static-scene gate (each cell averages
+# a 12x12 block at 1080p, which evens out sensor noise but keeps small objects)
+STATIC_CHECK_SIZE = (160, 90)
+
+
+def _is_static_pair(img0, img1, threshold):
+    """
+    Cheap check for a (nearly) unchanged frame pair
+    
+    Compares block-averaged thumbnails and takes the largest per-block difference,
+    so a small object moving over a still background still counts as motion; at
+    160x90 this costs well under a millisecond versus tens of milliseconds for an
+    IFNet pass.
+    
+    Args:
+        img0, img1: BGR uint8 frames
+        threshold: Largest block difference (0-255 scale) below which the pair is static
+    
+    Returns:
+        True if the pair can be interpolated by a plain blend
+    """
+    small0 = cv2.resize(img0, STATIC_CHECK_SIZE, interpolation=cv2.INTER_AREA)
+    small1 = cv2.resize(img1, STATIC_CHECK_SIZE, interpolation=cv2.INTER_AREA)
+    return cv2.absdiff(small0, small1).max() < threshold
+
+
+def _blend_subtree(img0, img1, multiplier):
+    """Fill the midpoint tree of one pair with plain blends (multiplier - 1 frames, in order)"""
+    if multiplier < 2:
+        return []
+    mid = _half_blend(img0, img1)
+    half = multiplier // 2
+    return _blend_subtree(img0, mid, half) + [mid] + _blend_subtree(mid, img1, half)
+
 
 def process_video_streaming(
     input_path,
@@ -21,7 +74,12 @@ def process_video_streaming(
     stop_event=None,
     save_png_count=20,
     png_output_dir=None,
-    progress_callback=None
+    progress_callback=None,
+    batch_size=8,
+    codec=None,
+    strip_height=None,
+    static_threshold=None,
+    hwaccel=None
 ):
     """
     Process video with RIFE interpolation using streaming assembly
@@ -31,40 +89,130 @@ def process_video_streaming(
         scale: RIFE scale parameter (1.0=normal, 2.0=high quality for fast motion)
         ensemble: If True, enable TTA ensemble (flip augmentation)
         stop_event: threading.Event to signal cancellation
+        save_png_count: Number of leading output frames also saved as PNGs for the report
+        png_output_dir: Directory for those PNGs (None disables the PNG export)
+        progress_callback: Called with the completed fraction (0.0-1.0) after every pair
+        batch_size: Maximum number of frame pairs per forward pass. Input pairs are read
+            batch_size at a time; at 4x/8x each midpoint-tree level has 2x/4x as many
+            pairs, which are split into forward passes of at most batch_size
+        codec: ffmpeg encoder for the output (e.g. 'h264_nvenc', 'libx264'), None = auto
+        strip_height: If set, run RIFE on horizontal strips of about this height (caps VRAM at 4K)
+        static_threshold: Opt-in static-scene gate. Input pairs whose largest block
+            difference (0-255) is below this are blended across their whole midpoint
+            tree instead of run through RIFE (0 or None, the default, disables it)
+        hwaccel: PyAV hardware decoder ('videotoolbox', 'cuda', ..., or 'auto'); None decodes
+            in software (PyAV when installed, otherwise OpenCV)
     """
     
-    def get_interpolated_frames(img0, img1, multiplier):
-        """Recursive helper to generate power-of-2 intermediate frames"""
-        if multiplier <= 1:
-            return []
-        
-        # Check stop signal deep in recursion too?
-        if stop_event and stop_event.is_set():
-            return []
-        
+    frames_skipped_static = 0
+    
+    def interpolate_midpoints(pairs):
+        """Interpolate the midpoint of every pair (at most batch_size) in one forward pass (blend on failure)"""
         try:
-            # Use standard process_pair with scale parameter
-            mid = processor.process_pair(img0, img1, scale=scale, ensemble=ensemble)
+            return run_model(pairs)
+        except torch.cuda.OutOfMemoryError:
+            # Even a single pair does not fit: fail loudly instead of silently blending
+            raise
         except Exception as e:
             print(f"\n[FALLBACK] Model Failed! Using Blend. Error: {e}")
-            mid = cv2.addWeighted(img0, 0.5, img1, 0.5, 0)
+            return [_half_blend(img0, img1) for img0, img1 in pairs]
+    
+    def run_model(pairs):
+        """Interpolate the midpoints of up to batch_size pairs, halving the batch on OOM"""
+        try:
+            # Pairs that form a chain of consecutive frames (a tree level with nothing
+            # skipped) upload every frame once; otherwise upload both sides of each pair
+            if all(a[1] is b[0] for a, b in zip(pairs, pairs[1:])):
+                return processor.process_batch(
+                    [pairs[0][0]] + [img1 for _, img1 in pairs],
+                    scale=scale,
+                    ensemble=ensemble,
+                    strip_height=strip_height
+                )
+            return processor.process_pair_batch(
+                [img0 for img0, _ in pairs],
+                [img1 for _, img1 in pairs],
+                scale=scale,
+                ensemble=ensemble,
+                strip_height=strip_height
+            )
+        except torch.cuda.OutOfMemoryError:
+            if len(pairs) == 1:
+                raise
+            torch.cuda.empty_cache()
+            half = len(pairs) // 2
+            print(f"\n[BATCH] Out of memory at {len(pairs)} pairs, retrying as {half} + {len(pairs) - half}")
+            return run_model(pairs[:half]) + run_model(pairs[half:])
+    
+    def get_interpolated_frames(pairs, multiplier):
+        """
+        Generate power-of-2 intermediate frames for a batch of pairs
+        
+        The midpoint tree is walked level by level: the adjacent frame pairs at the
+        current depth (across the whole batch) are interpolated together, in forward
+        passes of at most batch_size pairs, so deeper levels (2x, 4x, ... as many
+        pairs) never grow the forward batch past what the warmup and VRAM budget assume.
+        """
+        nonlocal frames_skipped_static
+        
+        # Only power-of-2 depths are generated (3x behaves like 2x, 6x like 4x, ...)
+        multiplier = 1 << (max(multiplier, 1).bit_length() - 1)
+        
+        # Preallocated in-order slots per pair: img0 at 0, img1 at `multiplier`, and
+        # each tree level fills the midpoints between slots `step` apart
+        sequences = [[img0] + [None] * (multiplier - 1) + [img1] for img0, img1 in pairs]
+        
+        # Static input pairs (e.g. a locked-off camera) are decided once, before the
+        # tree, and blended across their whole subtree, so no output sequence mixes
+        # RIFE and blend frames; only the remaining pairs walk the tree
+        if static_threshold:
+            moving = []
+            for seq in sequences:
+                if _is_static_pair(seq[0], seq[-1], static_threshold):
+                    seq[1:-1] = _blend_subtree(seq[0], seq[-1], multiplier)
+                    frames_skipped_static += multiplier - 1
+                else:
+                    moving.append(seq)
+        else:
+            moving = sequences
+        step = multiplier
+        
+        while step > 1:
+            # Check stop signal between tree levels
+            if stop_event and stop_event.is_set():
+                return [[] for _ in pairs]
             
-        # Recursive calls for 4x, 8x, etc.
-        # multiplier // 2 frames from left side, then mid, then multiplier // 2 frames from right side
-        return get_interpolated_frames(img0, mid, multiplier // 2) + [mid] + get_interpolated_frames(mid, img1, multiplier // 2)
+            half = step // 2
+            level_pairs = [(seq[i], seq[i + step]) for seq in moving for i in range(0, multiplier, step)]
+            level_mids = []
+            for start in range(0, len(level_pairs), batch_size):
+                level_mids.extend(interpolate_midpoints(level_pairs[start:start + batch_size]))
+            mids = iter(level_mids)
+            for seq in moving:
+                for i in range(0, multiplier, step):
+                    seq[i + half] = next(mids)
+            step = half
+        
+        # Drop the original endpoints, keeping only the intermediate frames
+        return [seq[1:-1] for seq in sequences]
 
     try:
         # ... (setup code omitted) ...
-        # Open input video
-        cap = cv2.VideoCapture(input_path)
-        if not cap.isOpened():
+        # Open input video (PyAV when installed, OpenCV otherwise)
+        opened = open_video(input_path, hwaccel=hwaccel)
+        if opened is None:
             raise FileNotFoundError(f"Cannot open video file: {input_path}")
+        fps, total_frames, frames = opened
         
-        # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        # Decode on a background thread so the next frames are ready when inference
+        # finishes (and already decoding while the model warms up)
+        reader = FrameReader(frames, stop_event=stop_event)
+        
+        # Read first frame; it also gives the video size
+        ret, last_frame = reader.read()
+        if not ret:
+            raise RuntimeError("Failed to read first frame from video")
+        height, width = last_frame.shape[:2]
         
         print(f"\n[VIDEO INFO]")
         print(f"  Input: {input_path}")
@@ -75,9 +223,9 @@ def process_video_streaming(
         # Use provided output_fps
         out_fps = output_fps
         
-        # Setup video writer
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        writer = cv2.VideoWriter(output_path, fourcc, out_fps, (width, height))
+        # Setup video writer (ffmpeg pipe, NVENC when available) on a background
+        # thread so encoding overlaps with decode and inference
+        writer = AsyncFrameWriter(open_video_writer(output_path, out_fps, (width, height), codec=codec))
         
         if not writer.isOpened():
             raise RuntimeError(f"Failed to create video writer for: {output_path}")
@@ -85,94 +233,138 @@ def process_video_streaming(
         print(f"\n[OUTPUT INFO]")
         print(f"  Output: {output_path}")
         print(f"  Target Playback FPS: {out_fps:.2f}")
+        print(f"  Encoder: {writer.codec}")
         print(f"  Multiplier: {target_fps_multiplier}x")
         print(f"  RIFE Scale: {scale}x")
         print(f"  Ensemble: {'ON' if ensemble else 'OFF'}")
+        print(f"  Batch Size: {batch_size} pairs")
+        if strip_height:
+            print(f"  Strip Height: {strip_height}px")
         print(f"  Expected frames: ~{total_frames * target_fps_multiplier}")
         
-        # Setup PNG export
+        # Compile/trace the model for this resolution before the timed loop starts
+        processor.warmup(width, height, batch_size=batch_size, scale=scale,
+                         ensemble=ensemble, strip_height=strip_height)
+        
+        # Setup PNG export (encoded on worker threads, off the inference loop)
         png_counter = 0
+        png_pool = None
+        
+        def save_png(path, frame):
+            """Queue a report PNG for encoding on the PNG worker pool"""
+            # No copy: decoded and interpolated frames are fresh arrays that nothing
+            # mutates afterwards, so the encoder and the PNG writer share one buffer
+            png_pool.submit(cv2.imwrite, path, frame, PNG_WRITE_PARAMS)
+        
+        # Without a target directory the PNG export is simply disabled
+        if png_output_dir is None:
+            save_png_count = 0
+        
         if save_png_count > 0:
-            if not os.path.exists(png_output_dir):
-                os.makedirs(png_output_dir)
+            png_pool = ThreadPoolExecutor(max_workers=2)
+            os.makedirs(png_output_dir, exist_ok=True)
             print(f"\n[PNG EXPORT]")
             print(f"  Saving first {save_png_count} frames to: {png_output_dir}")
         
-        # Read first frame
-        ret, last_frame = cap.read()
-        if not ret:
-            raise RuntimeError("Failed to read first frame from video")
-        
         # Write first frame
         writer.write(last_frame)
         if save_png_count > 0 and png_counter < save_png_count:
-            cv2.imwrite(os.path.join(png_output_dir, f"frame_{png_counter:04d}_original.png"), last_frame)
+            save_png(os.path.join(png_output_dir, f"frame_{png_counter:04d}_original.png"), last_frame)
             png_counter += 1
         
         # Statistics
         frames_written = 1
         frames_interpolated = 0
         
+        def write_frame(frame):
+            """Queue a frame for the writer; never block once cancellation was requested"""
+            if stop_event and stop_event.is_set():
+                writer.try_write(frame)
+            else:
+                writer.write(frame)
+        
         # Main processing loop
         print(f"\n[INTERPOLATION] Processing...")
-        pbar = tqdm(total=total_frames-1, desc="Interpolating", unit="pair")
+        # Containers without a frame count report 0 (no total, no progress fraction)
+        pbar = tqdm(total=total_frames - 1 if total_frames > 1 else None, desc="Interpolating", unit="pair")
+        
+        # Rolling window of decoded frames: the last frame of one batch
+        # is the first frame of the next one
+        window = deque([last_frame])
+        end_of_video = False
         
-        while True:
+        while not end_of_video:
             # Check for stop signal
             if stop_event and stop_event.is_set():
                 print("\n[STOP] Processing cancelled by user.")
                 break
-                
-            ret, current_frame = cap.read()
-            if not ret:
+            
+            # Read ahead until the window holds batch_size pairs
+            while len(window) < batch_size + 1:
+                ret, frame = reader.read()
+                if not ret:
+                    end_of_video = True
+                    break
+                window.append(frame)
+            
+            if len(window) < 2:
                 break
             
-            # Generate multiple interpolated frames (recursive)
-            intermediate_frames = get_interpolated_frames(last_frame, current_frame, target_fps_multiplier)
+            frames = list(window)
+            pairs = list(zip(frames[:-1], frames[1:]))
+            
+            # Generate multiple interpolated frames for the whole batch (recursive)
+            batch_intermediates = get_interpolated_frames(pairs, target_fps_multiplier)
             
             # If interrupted during recursion
             if stop_event and stop_event.is_set():
                 print("\n[STOP] Processing cancelled by user.")
                 break
             
-            # Write intermediate frames
-            for i, frame in enumerate(intermediate_frames):
-                writer.write(frame)
-                frames_written += 1
-                frames_interpolated += 1
+            for (_, current_frame), intermediate_frames in zip(pairs, batch_intermediates):
+                # Write intermediate frames
+                for i, frame in enumerate(intermediate_frames):
+                    write_frame(frame)
+                    frames_written += 1
+                    frames_interpolated += 1
+                    
+                    # Save PNG if within limit
+                    if save_png_count > 0 and png_counter < save_png_count:
+                        # Calculate timestamp for filename (e.g., 0.25, 0.5, 0.75)
+                        ts = (i + 1) / target_fps_multiplier
+                        png_path = os.path.join(png_output_dir, f"idx{png_counter:04d}_time{ts:.3f}_interpolated.png")
+                        save_png(png_path, frame)
+                        png_counter += 1
                 
-                # Save PNG if within limit
+                # Write the next original frame
+                write_frame(current_frame)
+                frames_written += 1
                 if save_png_count > 0 and png_counter < save_png_count:
-                    # Calculate timestamp for filename (e.g., 0.25, 0.5, 0.75)
-                    ts = (i + 1) / target_fps_multiplier
-                    png_path = os.path.join(png_output_dir, f"idx{png_counter:04d}_time{ts:.3f}_interpolated.png")
-                    cv2.imwrite(png_path, frame)
+                    png_path = os.path.join(png_output_dir, f"idx{png_counter:04d}_time1.000_original.png")
+                    save_png(png_path, current_frame)
                     png_counter += 1
+                
+                # Update
+                pbar.update(1)
+                
+                if progress_callback and pbar.total:
+                    percent = pbar.n / pbar.total
+                    progress_callback(percent)
             
-            # Write the next original frame
-            writer.write(current_frame)
-            frames_written += 1
-            if save_png_count > 0 and png_counter < save_png_count:
-                png_path = os.path.join(png_output_dir, f"idx{png_counter:04d}_time1.000_original.png")
-                cv2.imwrite(png_path, current_frame)
-                png_counter += 1
-            
-            # Update
-            last_frame = current_frame
-            pbar.update(1)
-            
-            if progress_callback:
-                percent = pbar.n / pbar.total
-                progress_callback(percent)
+            # Keep only the last frame as the start of the next batch
+            while len(window) > 1:
+                window.popleft()
         
         # Final 100% signal (only if finished naturally)
         if progress_callback and not (stop_event and stop_event.is_set()):
             progress_callback(1.0)
         
-        # Cleanup
+        # Cleanup (on cancel, frames still queued for the encoder are dropped)
         pbar.close()
-        cap.release()
-        writer.release()
+        if png_pool:
+            png_pool.shutdown(wait=True)
+        reader.release()
+        writer.release(drop_pending=bool(stop_event and stop_event.is_set()))
         
         if stop_event and stop_event.is_set():
             print(f"\n[CANCELLED]")
@@ -182,6 +374,8 @@ def process_video_streaming(
         print(f"\n[COMPLETE]")
         print(f"  ✓ Frames interpolated: {frames_interpolated}")
         print(f"  ✓ Total frames written: {frames_written}")
+        if frames_skipped_static:
+            print(f"  ✓ Static frames blended (RIFE skipped): {frames_skipped_static}")
         if save_png_count > 0:
             print(f"  ✓ PNG frames saved: {png_counter}")
         print(f"  ✓ Output saved to: {output_path}")
@@ -193,6 +387,7 @@ def process_video_streaming(
             'input_fps': fps,
             'output_fps': out_fps,
             'png_saved': png_counter,
+            'frames_skipped_static': frames_skipped_static,
             'success': True
         }
         
@@ -208,7 +403,15 @@ def process_video_streaming(
     finally:
         # Ensure resources are released
         try:
-            cap.release()
+            reader.release()
+        except:
+            pass
+        try:
+            if png_pool:
+                png_pool.shutdown(wait=True)
+        except:
+            pass
+        try:
             writer.release()
         except:
             pass
\ No newline at end of file
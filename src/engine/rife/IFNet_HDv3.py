@@ -104,7 +104,7 @@ class IFNet(nn.Module):
             img0 = x[:, :channel]
             img1 = x[:, channel:]
         if not torch.is_tensor(timestep):
-            timestep = (x[:, :1].clone() * 0 + 1) * timestep
+            timestep = torch.full_like(x[:, :1], timestep)
         else:
             timestep = timestep.repeat(1, 1, img0.shape[2], img0.shape[3])
         f0 = self.encode(img0[:, :3])
@@ -9,6 +9,14 @@ from torch.nn.parallel import DistributedDataParallel as DDP
 from .IFNet_HDv3 import *
 import torch.nn.functional as F
 from .model.loss import *
+import functools
+
+
+@functools.lru_cache(maxsize=None)
+def pyramid_scales(scale=1.0):
+    """Per-level IFNet downscale factors for a RIFE scale, as a constant tuple"""
+    return (16/scale, 8/scale, 4/scale, 2/scale, 1/scale)
+
 
 class Model:
     def __init__(self, local_rank=-1, device_override=None):
@@ -27,6 +35,9 @@ class Model:
         self.version = 4.25
         self.sobel = SOBEL()
         
+        # Print flow/mask statistics for every inference call (debugging only)
+        self.log_stats = False
+        
         if local_rank != -1:
             self.flownet = DDP(self.flownet, device_ids=[local_rank], output_device=local_rank)
 
@@ -63,20 +74,20 @@ class Model:
 
     def inference(self, img0, img1, timestep=0.5, scale=1.0):
         imgs = torch.cat((img0, img1), 1)
-        scale_list = [16/scale, 8/scale, 4/scale, 2/scale, 1/scale]
         # flow_list, mask, merged = self.flownet(imgs, timestep, scale_list)
-        flow_list, mask, merged = self.flownet(imgs, timestep, scale_list)
-        
-        # Debug logging (Every frame)
-        # flow_list is a list of tensors. Check the last one (finest scale)
-        last_flow = flow_list[-1]
-        # flow channels: dx, dy, dx, dy (4 channels)
-        # We only care about magnitude
-        flow_mag = last_flow.abs().mean().item()
-        mask_val = mask.mean().item()
+        flow_list, mask, merged = self.flownet(imgs, timestep, pyramid_scales(scale))
         
-        status = "MOTION" if flow_mag > 0.5 else "STATIONARY/BLEND?"
-        print(f"[RIFE] Scale={scale} | FlowMag={flow_mag:.4f} | Mask={mask_val:.2f} | {status}")
+        # Debug logging (opt-in: the .item() calls sync the device on every frame)
+        if self.log_stats:
+            # flow_list is a list of tensors. Check the last one (finest scale)
+            last_flow = flow_list[-1]
+            # flow channels: dx, dy, dx, dy (4 channels)
+            # We only care about magnitude
+            flow_mag = last_flow.abs().mean().item()
+            mask_val = mask.mean().item()
+            
+            status = "MOTION" if flow_mag > 0.5 else "STATIONARY/BLEND?"
+            print(f"[RIFE] Scale={scale} | FlowMag={flow_mag:.4f} | Mask={mask_val:.2f} | {status}")
         
         return merged[-1]
     
@@ -7,7 +7,7 @@ device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 import torch
 
-def gauss_kernel(size=5, channels=3):
+def gauss_kernel(size=5, channels=3, device=device):
     kernel = torch.tensor([[1., 4., 6., 4., 1],
                            [4., 16., 24., 16., 4.],
                            [6., 24., 36., 24., 6.],
@@ -18,17 +18,24 @@ def gauss_kernel(size=5, channels=3):
     kernel = kernel.to(device)
     return kernel
 
+# Upsampling kernels (already scaled by 4), keyed by (channels, device, dtype)
+upsample_kernels = {}
+
 def downsample(x):
     return x[:, :, ::2, ::2]
 
 def upsample(x):
-    cc = torch.cat([x, torch.zeros(x.shape[0], x.shape[1], x.shape[2], x.shape[3]).to(device)], dim=3)
+    # Allocate the zero padding directly on the input's device (no host upload)
+    cc = torch.cat([x, x.new_zeros(x.shape[0], x.shape[1], x.shape[2], x.shape[3])], dim=3)
     cc = cc.view(x.shape[0], x.shape[1], x.shape[2]*2, x.shape[3])
     cc = cc.permute(0,1,3,2)
-    cc = torch.cat([cc, torch.zeros(x.shape[0], x.shape[1], x.shape[3], x.shape[2]*2).to(device)], dim=3)
+    cc = torch.cat([cc, x.new_zeros(x.shape[0], x.shape[1], x.shape[3], x.shape[2]*2)], dim=3)
     cc = cc.view(x.shape[0], x.shape[1], x.shape[3]*2, x.shape[2]*2)
     x_up = cc.permute(0,1,3,2)
-    return conv_gauss(x_up, 4*gauss_kernel(channels=x.shape[1]))
+    k = (x.shape[1], x.device, x.dtype)
+    if k not in upsample_kernels:
+        upsample_kernels[k] = (4*gauss_kernel(channels=x.shape[1], device=x.device)).to(x.dtype)
+    return conv_gauss(x_up, upsample_kernels[k])
 
 def conv_gauss(img, kernel):
     img = torch.nn.functional.pad(img, (2, 2, 2, 2), mode='reflect')
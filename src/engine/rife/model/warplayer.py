@@ -1,31 +1,88 @@
 import torch
-import torch.nn as nn
+import functools
 
-backwarp_tenGrid = {}
 
-
-def warp(tenInput, tenFlow):
-    # Use device from input tensor instead of global device
-    target_device = tenFlow.device
+@functools.lru_cache(maxsize=8)
+def base_grid(device, H, W):
+    """
+    Identity sampling grid [1, 2, H, W] in [-1, 1] plus the (1, 2, 1, 1) pixel -> [-1, 1]
+    flow scaling for one device and resolution
     
-    k = (str(tenFlow.device), str(tenFlow.size()))
-    if k not in backwarp_tenGrid:
-        tenHorizontal = torch.linspace(-1.0, 1.0, tenFlow.shape[3], device=target_device).view(
-            1, 1, 1, tenFlow.shape[3]).expand(tenFlow.shape[0], -1, tenFlow.shape[2], -1)
-        tenVertical = torch.linspace(-1.0, 1.0, tenFlow.shape[2], device=target_device).view(
-            1, 1, tenFlow.shape[2], 1).expand(tenFlow.shape[0], -1, -1, tenFlow.shape[3])
-        backwarp_tenGrid[k] = torch.cat(
-            [tenHorizontal, tenVertical], 1).to(target_device)
+    Built with a batch dimension of 1 so the add in warp() broadcasts it over any
+    batch size. Kept in FP32 even for FP16 models, since an FP16 grid cannot resolve
+    sub-pixel offsets at HD widths. Bounded, so old resolutions are evicted.
+    """
+    tenHorizontal = torch.linspace(-1.0, 1.0, W, device=device).view(
+        1, 1, 1, W).expand(1, -1, H, -1)
+    tenVertical = torch.linspace(-1.0, 1.0, H, device=device).view(
+        1, 1, H, 1).expand(1, -1, -1, W)
+    tenNorm = torch.tensor([2.0 / (W - 1.0), 2.0 / (H - 1.0)], device=device).view(1, 2, 1, 1)
+    return torch.cat([tenHorizontal, tenVertical], 1), tenNorm
+
+
+def invalidate():
+    """Free all cached grids (e.g. when the input resolution changes)"""
+    base_grid.cache_clear()
 
-    tenFlow = torch.cat([tenFlow[:, 0:1, :, :] / ((tenInput.shape[3] - 1.0) / 2.0),
-                         tenFlow[:, 1:2, :, :] / ((tenInput.shape[2] - 1.0) / 2.0)], 1)
 
-    g = (backwarp_tenGrid[k] + tenFlow).permute(0, 2, 3, 1)
+def warp(tenInput, tenFlow):
+    # The base grid only depends on device and resolution
+    tenGrid, tenNorm = base_grid(tenFlow.device, tenFlow.shape[2], tenFlow.shape[3])
+
+    # grid + flow * norm in a single kernel (replaces two divides, a cat and an add)
+    g = torch.addcmul(tenGrid, tenFlow, tenNorm).permute(0, 2, 3, 1)
     
-    # MPS Workaround: 'border' padding mode is unsupported on MPS.
-    # We clamp the grid values to [-1, 1] and use 'zeros' padding to mimic 'border' behavior.
+    # MPS Workaround: 'border' padding mode is unsupported on MPS, and its grid_sample
+    # is a slow generic kernel; sample with four gathers instead (clamped indices
+    # give 'border' behavior)
     if tenInput.device.type == 'mps':
-        g = torch.clamp(g, -1.0, 1.0)
-        return torch.nn.functional.grid_sample(input=tenInput, grid=g, mode='bilinear', padding_mode='zeros', align_corners=True)
+        return bilinear_gather(tenInput, g)
+    
+    # grid_sample returns NCHW even for an NHWC input; hand channels_last models an
+    # NHWC result so the decoder convs don't bounce between layouts after every warp
+    if tenInput.shape[1] > 1 and tenInput.is_contiguous(memory_format=torch.channels_last):
+        return _grid_sample(tenInput, g).contiguous(memory_format=torch.channels_last)
+    return _grid_sample(tenInput, g)
+
+
+def _grid_sample(tenInput, g):
+    # FP16 models: the grid stays FP32 (an FP16 grid cannot resolve sub-pixel offsets
+    # at HD widths), so sample in FP32 and cast back, as CUDA autocast would do
+    if g.dtype != tenInput.dtype:
+        return torch.nn.functional.grid_sample(input=tenInput.float(), grid=g.float(), mode='bilinear',
+                                               padding_mode='border', align_corners=True).to(tenInput.dtype)
     
     return torch.nn.functional.grid_sample(input=tenInput, grid=g, mode='bilinear', padding_mode='border', align_corners=True)
+
+
+def bilinear_gather(tenInput, g):
+    """
+    Bilinear sampling as elementwise ops and gathers
+    
+    Equivalent to grid_sample(..., mode='bilinear', padding_mode='border',
+    align_corners=True) for a normalized grid g [B, H, W, 2].
+    """
+    B, C, H, W = tenInput.shape
+    Ho, Wo = g.shape[1], g.shape[2]
+    
+    # Normalized [-1, 1] -> pixel coordinates, clamped to the border
+    x = ((g[..., 0] + 1.0) * ((W - 1) / 2.0)).clamp(0, W - 1)
+    y = ((g[..., 1] + 1.0) * ((H - 1) / 2.0)).clamp(0, H - 1)
+    x0 = x.floor()
+    y0 = y.floor()
+    dx = (x - x0).unsqueeze(1)
+    dy = (y - y0).unsqueeze(1)
+    x0 = x0.long()
+    y0 = y0.long()
+    x1 = (x0 + 1).clamp(max=W - 1)
+    y1 = (y0 + 1).clamp(max=H - 1)
+    
+    flat = tenInput.reshape(B, C, H * W)
+    
+    def tap(yy, xx):
+        index = (yy * W + xx).view(B, 1, Ho * Wo).expand(-1, C, -1)
+        return flat.gather(2, index).view(B, C, Ho, Wo)
+    
+    top = tap(y0, x0) * (1 - dx) + tap(y0, x1) * dx
+    bottom = tap(y1, x0) * (1 - dx) + tap(y1, x1) * dx
+    return (top * (1 - dy) + bottom * dy).to(tenInput.dtype)
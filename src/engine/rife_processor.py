@@ -4,22 +4,48 @@ Provides a clean interface for video frame interpolation
 """
 
 import torch
-import cv2
 import numpy as np
-import torch.nn.functional as F
 import os
+import copy
+import warnings
+
+from .rife.RIFE_HDv3 import pyramid_scales
+from .rife.model import warplayer
+
+
+class _FlownetInference(torch.nn.Module):
+    """Fixed timestep/scale view of IFNet with a tensor-only signature, for torch.jit.trace"""
+    
+    def __init__(self, flownet, timestep, scale):
+        super().__init__()
+        self.flownet = flownet
+        self.timestep = timestep
+        self.scale_list = pyramid_scales(scale)
+    
+    def forward(self, img0, img1):
+        flow_list, mask, merged = self.flownet(torch.cat((img0, img1), 1), self.timestep, self.scale_list)
+        return merged[-1]
 
 
 class RIFEProcessor:
     """Wrapper for RIFE HDv3 frame interpolation model"""
     
-    def __init__(self, model_dir=None, device=None):
+    def __init__(self, model_dir=None, device=None, jit=False, fp16=None, channels_last=False, compile=False, cuda_graph=False, backend="torch"):
         """
         Initialize RIFE processor
         
         Args:
             model_dir: Directory containing flownet.pkl weights
             device: 'mps', 'cuda', 'cpu', or None for auto-detection
+            jit: If True, run IFNet through TorchScript graphs traced once per input shape
+                (frozen; output matches the eager path to within 1/255 after rounding)
+            fp16: Run IFNet in half precision (autocast on CUDA); None = on for CUDA only
+                (opt-in on MPS, where FP16 has been unstable)
+            channels_last: If True, keep weights and activations in NHWC memory layout
+            compile: If True, compile IFNet with torch.compile (CUDA only; call warmup() before timing)
+            cuda_graph: If True, capture IFNet into a CUDA graph per input shape and replay it (CUDA only)
+            backend: 'torch', or 'coreml' to run IFNet as a Core ML model on Apple Silicon
+                (requires coremltools; converted once per input shape and cached on disk)
         """
         # Auto-detect device if not specified
         if device is None:
@@ -47,7 +73,7 @@ class RIFEProcessor:
         
         # Load weights
         try:
-            self.model.load_model(model_dir, rank=0)
+            self.model.load_model(model_dir, rank=-1)
             print(f"[RIFE] Successfully loaded weights from {model_dir}/flownet.pkl")
             if hasattr(self.model, 'version'):
                  print(f"[RIFE] Model version: {self.model.version}")
@@ -55,19 +81,414 @@ class RIFEProcessor:
             print(f"[RIFE] WARNING: Failed to load weights: {e}")
             print(f"[RIFE] Using randomly initialized weights (results will be poor)")
         
-        # Enable FP16 (Half Precision) - DISABLED for stability on Mac/MPS
-        # self.fp16 = self.device.type in ['mps', 'cuda']
-        self.fp16 = False 
+        # FP16 (Half Precision) - on by default on CUDA: halves memory traffic and uses
+        # Tensor Cores; the warp samples in FP32 so flow precision is preserved.
+        # Stays opt-in on Mac/MPS, where FP16 was disabled for stability
+        if fp16 is None:
+            fp16 = self.device.type == 'cuda'
+        self.fp16 = fp16 and self.device.type in ['mps', 'cuda']
+        if fp16 and not self.fp16:
+            print(f"[RIFE] FP16 requested but not supported on {self.device.type}, using FP32")
         if self.fp16:
             print(f"[RIFE] Enabling FP16 Half-Precision mode for optimization")
             self.model.flownet.half()
+        
+        # channels_last (NHWC) layout speeds up the conv-heavy IFNet blocks on Tensor Cores
+        self.channels_last = channels_last
+        if self.channels_last:
+            print(f"[RIFE] Using channels_last memory format")
+            self.model.flownet.to(memory_format=torch.channels_last)
             
         # Set to eval mode (model should already be on correct device)
         self.model.eval()
         
+        # TorchScript: IFNet is not scriptable (untyped args, shape-dependent
+        # branches), so graphs are traced per (shape, dtype, timestep, scale)
+        self.jit = jit
+        self._traced = {}
+        if self.jit:
+            print(f"[RIFE] TorchScript tracing enabled")
+            if self.device.type == 'cuda':
+                # Shapes are fixed per video, so let cuDNN pick the fastest kernels once
+                torch.backends.cudnn.benchmark = True
+        
+        # torch.compile fuses IFNet's many small pointwise ops and, in reduce-overhead
+        # mode, replays CUDA graphs; the MPS/CPU inductor backends are not worth it yet
+        self.compile = compile and self.device.type == 'cuda'
+        if compile and not self.compile:
+            print(f"[RIFE] torch.compile requested but only enabled on CUDA, running eager")
+        if self.compile:
+            print(f"[RIFE] Compiling IFNet with torch.compile (mode=reduce-overhead)")
+            # Static shapes: batches are padded to one size in _inference (see there)
+            self.model.flownet = torch.compile(self.model.flownet, mode='reduce-overhead', fullgraph=False,
+                                               dynamic=False)
+            self._compile_batch = 0
+            if self.jit:
+                # A compiled module cannot be traced again; compile supersedes the trace
+                print(f"[RIFE] TorchScript tracing disabled in favour of torch.compile")
+                self.jit = False
+        
+        # CUDA graphs: the padded shape is fixed per video, so every forward pass
+        # launches the same few hundred kernels; capture them once and replay
+        self.cuda_graph = cuda_graph and self.device.type == 'cuda' and not self.compile
+        self._graphs = {}
+        if cuda_graph and not self.cuda_graph:
+            print(f"[RIFE] CUDA graphs requested but unavailable (needs CUDA, not combined with compile)")
+        if self.cuda_graph:
+            print(f"[RIFE] CUDA graph capture enabled")
+            torch.backends.cudnn.benchmark = True
+        
+        # Core ML: one converted .mlpackage per (shape, timestep, scale); falls back
+        # to PyTorch when coremltools is missing or a conversion fails
+        self.backend = backend
+        self._coreml = {}
+        if self.backend == 'coreml':
+            try:
+                import coremltools  # noqa: F401
+                print(f"[RIFE] Core ML backend enabled")
+            except ImportError:
+                print(f"[RIFE] Core ML backend requested but coremltools is not installed, using PyTorch")
+                self.backend = 'torch'
+        
+        # Ring of reusable pinned host buffers for uploads, keyed by batch shape (CUDA only)
+        self._staging = {}
+        self._staging_index = 0
+        
+        # Persistent padded device input buffers, keyed by (slot, shape, dtype)
+        self._input_buffers = {}
+        self._frame_size = None
+        
+        # Dedicated CUDA stream for host-to-device copies, so uploads overlap with compute
+        self._copy_stream = torch.cuda.Stream(self.device) if self.device.type == 'cuda' else None
+        
         print(f"[RIFE] Model ready for inference")
     
-    def process_pair(self, img0_bgr, img1_bgr, scale=1.0, timestep=0.5, ensemble=False):
+    def _staging_buffer(self, shape, ring_size=4):
+        """
+        Return the next pinned uint8 host buffer of the given shape
+        
+        Each batch ends with a device-to-host copy that synchronizes the stream, so a
+        buffer's previous async upload has always finished by the time it is reused.
+        One ring is kept per frame size, sized for the largest batch seen and sliced
+        to the requested batch (pinned memory is scarce; batch sizes vary constantly).
+        """
+        b = shape[0]
+        key = tuple(shape[1:])
+        ring = self._staging.get(key)
+        if ring is None or ring[0].shape[0] < b:
+            self._staging.pop(key, None)
+            ring = [torch.empty(shape, dtype=torch.uint8, pin_memory=True) for _ in range(ring_size)]
+            self._staging[key] = ring
+        self._staging_index = (self._staging_index + 1) % ring_size
+        return ring[self._staging_index][:b]
+    
+    def _inference(self, I0, I1, timestep, scale, max_traces=8):
+        """
+        Run IFNet on padded tensors, through a cached TorchScript trace when enabled
+        
+        At most `max_traces` frozen traces are kept (one per shape, dtype, timestep, scale).
+        """
+        if self.backend == 'coreml':
+            middle = self._coreml_inference(I0, I1, timestep, scale)
+            if middle is not None:
+                return middle
+        if self.compile:
+            # Batch sizes vary per call (static gate, tree levels, the tail), and every
+            # new shape would recompile; pad by repeating the last pair up to the next
+            # power of two, capped at this run's batch (set by warmup), so a run
+            # compiles at most log2(batch) + 1 graphs and a small tail stays small
+            b = I0.shape[0]
+            self._compile_batch = max(self._compile_batch, b)
+            pad = min(1 << (b - 1).bit_length(), self._compile_batch) - b
+            if pad:
+                I0 = torch.cat([I0, I0[-1:].expand(pad, -1, -1, -1)])
+                I1 = torch.cat([I1, I1[-1:].expand(pad, -1, -1, -1)])
+            # CUDA graph outputs are overwritten by the next replay (e.g. the next
+            # strip), so hand out a copy
+            return self.model.inference(I0, I1, timestep=timestep, scale=scale)[:b].clone()
+        if self.cuda_graph:
+            return self._graph_inference(I0, I1, timestep, scale)
+        if not self.jit:
+            return self.model.inference(I0, I1, timestep=timestep, scale=scale)
+        
+        key = (tuple(I0.shape), I0.dtype, float(timestep), float(scale))
+        traced = self._traced.get(key)
+        if traced is None:
+            print(f"[RIFE] Tracing IFNet for input {tuple(I0.shape)} (one-time warm-up)")
+            if len(self._traced) >= max_traces:
+                # Evict the oldest trace (dicts keep insertion order)
+                self._traced.pop(next(iter(self._traced)))
+            module = _FlownetInference(self.model.flownet, timestep, scale)
+            with warnings.catch_warnings(), torch.no_grad():
+                warnings.simplefilter("ignore", torch.jit.TracerWarning)
+                traced = torch.jit.trace(module, (I0, I1), check_trace=False)
+                # Freezing inlines the weights as constants so conv/bias and pointwise
+                # ops can be folded; keep the plain trace if a backend cannot freeze it
+                try:
+                    traced = torch.jit.freeze(traced.eval())
+                except Exception as e:
+                    print(f"[RIFE] torch.jit.freeze failed, using unfrozen trace: {e}")
+            self._traced[key] = traced
+        return traced(I0, I1)
+    
+    def _build_coreml(self, shape, timestep, scale):
+        """
+        Convert IFNet to a Core ML program for one input shape, reusing a saved .mlpackage
+        
+        Returns:
+            coremltools MLModel, or None if the conversion failed
+        """
+        import coremltools as ct
+        
+        b, c, h, w = shape
+        cache_dir = os.path.join(self.model_dir, 'coreml')
+        precision = 'fp16' if self.fp16 else 'fp32'
+        path = os.path.join(cache_dir, f"ifnet_{b}x{h}x{w}_t{timestep}_s{scale}_{precision}.mlpackage")
+        compute_units = ct.ComputeUnit.CPU_AND_GPU
+        
+        try:
+            if os.path.exists(path):
+                return ct.models.MLModel(path, compute_units=compute_units)
+            
+            print(f"[RIFE] Converting IFNet to Core ML for input {tuple(shape)} (one-time, may take a while)")
+            # Convert from a float32 CPU copy; Core ML applies the FP16 precision itself
+            flownet = copy.deepcopy(self.model.flownet).float().cpu().eval()
+            module = _FlownetInference(flownet, timestep, scale)
+            example = torch.zeros(shape)
+            with warnings.catch_warnings(), torch.no_grad():
+                warnings.simplefilter("ignore", torch.jit.TracerWarning)
+                traced = torch.jit.trace(module, (example, example), check_trace=False)
+            
+            mlmodel = ct.convert(
+                traced,
+                inputs=[ct.TensorType(name='img0', shape=shape, dtype=np.float32),
+                        ct.TensorType(name='img1', shape=shape, dtype=np.float32)],
+                outputs=[ct.TensorType(name='middle')],
+                compute_precision=ct.precision.FLOAT16 if self.fp16 else ct.precision.FLOAT32,
+                compute_units=compute_units,
+            )
+            os.makedirs(cache_dir, exist_ok=True)
+            mlmodel.save(path)
+            return mlmodel
+        except Exception as e:
+            print(f"[RIFE] Core ML conversion failed, using PyTorch for this shape: {e}")
+            return None
+    
+    def _coreml_inference(self, I0, I1, timestep, scale):
+        """Run IFNet through Core ML; returns None when no Core ML model is available"""
+        key = (tuple(I0.shape), float(timestep), float(scale))
+        if key not in self._coreml:
+            self._coreml[key] = self._build_coreml(tuple(I0.shape), float(timestep), float(scale))
+        mlmodel = self._coreml[key]
+        if mlmodel is None:
+            return None
+        
+        out = mlmodel.predict({
+            'img0': I0.float().cpu().numpy(),
+            'img1': I1.float().cpu().numpy(),
+        })['middle']
+        return torch.from_numpy(out).to(self.device, I0.dtype)
+    
+    def _graph_inference(self, I0, I1, timestep, scale, max_graphs=8):
+        """
+        Run IFNet by replaying a CUDA graph captured for this (shape, dtype, timestep, scale)
+        
+        Inputs are copied into the graph's static tensors and the output is cloned,
+        since the next replay overwrites it. At most `max_graphs` graphs are kept.
+        """
+        key = (tuple(I0.shape), I0.dtype, float(timestep), float(scale))
+        entry = self._graphs.get(key)
+        if entry is None:
+            print(f"[RIFE] Capturing CUDA graph for input {tuple(I0.shape)} (one-time warm-up)")
+            if len(self._graphs) >= max_graphs:
+                # Evict the oldest capture (dicts keep insertion order)
+                self._graphs.pop(next(iter(self._graphs)))
+            
+            # Capture the bare flownet: Model.inference logs stats with host syncs,
+            # which are not allowed inside a capture
+            module = _FlownetInference(self.model.flownet, timestep, scale)
+            static_I0 = I0.clone()
+            static_I1 = I1.clone()
+            
+            # Warm up on a side stream so cuDNN autotuning and allocations are done before capture
+            current = torch.cuda.current_stream(self.device)
+            side = torch.cuda.Stream(self.device)
+            side.wait_stream(current)
+            with torch.cuda.stream(side):
+                for _ in range(2):
+                    module(static_I0, static_I1)
+            current.wait_stream(side)
+            
+            # Autocast's weight-cast cache must be off while capturing, or the cached
+            # casts are freed from under the graph
+            graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(graph), torch.autocast(device_type='cuda', dtype=torch.float16,
+                                                          enabled=self.fp16, cache_enabled=False):
+                static_out = module(static_I0, static_I1)
+            entry = (graph, static_I0, static_I1, static_out)
+            self._graphs[key] = entry
+        
+        graph, static_I0, static_I1, static_out = entry
+        static_I0.copy_(I0)
+        static_I1.copy_(I1)
+        graph.replay()
+        return static_out.clone()
+    
+    def warmup(self, width, height, batch_size=1, scale=1.0, ensemble=False, strip_height=None):
+        """
+        Run two dummy batches so compilation/tracing happens before real frames arrive
+        
+        A no-op unless torch.compile, TorchScript tracing or CUDA graphs are enabled.
+        
+        Args:
+            width, height: Frame size of the video that will be processed
+            batch_size: Number of frame pairs per forward pass
+        """
+        if not (self.compile or self.jit or self.cuda_graph):
+            return
+        if self.compile:
+            # The pad target follows this run's batch size, not an earlier, larger run
+            self._compile_batch = 0
+        print(f"[RIFE] Warming up for {width}x{height}, batch {batch_size}...")
+        frames = [np.zeros((height, width, 3), dtype=np.uint8)] * (batch_size + 1)
+        for _ in range(2):
+            self.process_batch(frames, scale=scale, ensemble=ensemble, strip_height=strip_height)
+    
+    def _inference_strips(self, I0, I1, timestep, scale, strip_height, overlap=64):
+        """
+        Run IFNet on overlapping horizontal strips and feather them back together
+        
+        Peak activation memory scales with strip height instead of frame height,
+        which lets 4K frames (or larger batches) fit in VRAM for the same FLOPs.
+        
+        Args:
+            I0, I1: Padded input tensors [B, 3, H, W] (H, W multiples of 64)
+            strip_height: Target strip height in pixels (rounded up to a multiple of 64)
+            overlap: Rows shared by neighbouring strips, cross-faded to hide seams
+        """
+        h = I0.shape[2]
+        strip_h = max(((strip_height - 1) // 64 + 1) * 64, 2 * overlap)
+        if strip_h >= h:
+            return self._inference(I0, I1, timestep, scale)
+        
+        # Strip start rows; the last strip is aligned to the bottom edge
+        starts = list(range(0, h - strip_h, strip_h - overlap)) + [h - strip_h]
+        
+        # Linear ramp across the overlap (never exactly 0, so weights always sum > 0)
+        ramp = (torch.arange(overlap, device=I0.device, dtype=torch.float32) + 0.5) / overlap
+        
+        out = None
+        weight_sum = torch.zeros(h, device=I0.device, dtype=torch.float32)
+        for i, y in enumerate(starts):
+            middle = self._inference(I0[:, :, y:y + strip_h], I1[:, :, y:y + strip_h], timestep, scale).float()
+            
+            weight = torch.ones(strip_h, device=I0.device, dtype=torch.float32)
+            if i > 0:
+                weight[:overlap] = ramp
+            if i < len(starts) - 1:
+                weight[-overlap:] = ramp.flip(0)
+            
+            if out is None:
+                out = torch.zeros(middle.shape[:2] + (h, middle.shape[3]), device=middle.device, dtype=middle.dtype)
+            out[:, :, y:y + strip_h] += middle * weight.view(1, 1, -1, 1)
+            weight_sum[y:y + strip_h] += weight
+        
+        return out / weight_sum.view(1, 1, -1, 1)
+    
+    def _input_buffer(self, slot, shape, dtype):
+        """
+        Return the persistent padded input buffer for a slot (0 = I0, 1 = I1)
+        
+        The frame size is fixed per video, so reusing the buffers avoids two large device
+        allocations (conversion + F.pad) per input batch. Safe to overwrite on the
+        next call: work is ordered on the compute stream and nothing keeps a reference.
+        """
+        # One buffer per slot and padded size, grown to the largest batch seen and
+        # sliced: batch sizes vary constantly (static gate, tree levels, the tail)
+        b = shape[0]
+        key = (slot,) + tuple(shape[1:]) + (dtype,)
+        buf = self._input_buffers.get(key)
+        if buf is None or buf.shape[0] < b:
+            memory_format = torch.channels_last if self.channels_last else torch.contiguous_format
+            self._input_buffers.pop(key, None)
+            buf = torch.empty(shape, dtype=dtype, device=self.device, memory_format=memory_format)
+            self._input_buffers[key] = buf
+        return buf[:b]
+    
+    def _resolution_changed(self, h, w):
+        """
+        Drop everything cached for the previous frame size
+        
+        Device/pinned buffers, warp grids, frozen traces (which bake grids in as
+        constants), captured CUDA graphs (with their static tensors) and loaded
+        Core ML models are all shape-specific; Core ML packages stay cached on disk.
+        """
+        if self._frame_size is not None:
+            print(f"[RIFE] Input resolution changed to {w}x{h}, releasing cached buffers")
+            self._input_buffers.clear()
+            self._staging.clear()
+            self._traced.clear()
+            self._graphs.clear()
+            self._coreml.clear()
+            warplayer.invalidate()
+            if self.compile:
+                self._compile_batch = 0
+        self._frame_size = (h, w)
+    
+    def _upload_frames(self, frames_bgr, slot=0):
+        """
+        Move a list of uint8 BGR frames to the device as a normalized, padded RGB tensor
+        
+        Args:
+            frames_bgr: Sequence of frames, each (H, W, 3) uint8 in BGR format
+            slot: Which persistent input buffer to fill (0 or 1)
+            
+        Returns:
+            Tensor [B, 3, H', W'] in RGB, scaled to [0, 1] and reflect-padded so H', W'
+            are multiples of 64 (a reused buffer, valid until the next call for this slot)
+        """
+        # Release the previous resolution's buffers before allocating new ones
+        h, w = frames_bgr[0].shape[:2]
+        if (h, w) != self._frame_size:
+            self._resolution_changed(h, w)
+        
+        if self.device.type == 'cuda':
+            # Stack straight into a reused pinned buffer so the upload can run async
+            staging = self._staging_buffer((len(frames_bgr),) + frames_bgr[0].shape)
+            np.stack(frames_bgr, out=staging.numpy())
+            
+            # Copy on the side stream; the compute stream only waits for this copy,
+            # so the next upload (e.g. I1) overlaps with converting this batch
+            with torch.cuda.stream(self._copy_stream):
+                batch = staging.to(self.device, non_blocking=True)
+            compute_stream = torch.cuda.current_stream(self.device)
+            compute_stream.wait_stream(self._copy_stream)
+            batch.record_stream(compute_stream)
+        else:
+            batch = torch.from_numpy(np.stack(frames_bgr)).to(self.device)
+        
+        # Pad to multiples of 64 (required by new 5-level architecture)
+        b = batch.shape[0]
+        tmp = 64
+        ph = ((h - 1) // tmp + 1) * tmp
+        pw = ((w - 1) // tmp + 1) * tmp
+        dtype = torch.float16 if self.fp16 else torch.float32
+        padded = self._input_buffer(slot, (b, 3, ph, pw), dtype)
+        
+        # BHWC -> BCHW, BGR -> RGB, uint8 -> float in [0, 1], written straight into the buffer
+        inner = padded[:, :, :h, :w]
+        inner.copy_(batch.permute(0, 3, 1, 2).flip(1))
+        inner.div_(255.0)
+        
+        # Use reflection padding to avoid edge artifacts affecting flow
+        # (same result as F.pad(..., mode='reflect'): columns first, then full-width rows)
+        if pw > w:
+            padded[:, :, :h, w:] = padded[:, :, :h, 2 * w - 1 - pw:w - 1].flip(3)
+        if ph > h:
+            padded[:, :, h:, :] = padded[:, :, 2 * h - 1 - ph:h - 1, :].flip(2)
+        return padded
+    
+    def process_pair(self, img0_bgr, img1_bgr, scale=1.0, timestep=0.5, ensemble=False, strip_height=None):
         """
         Generate interpolated frame between two input frames
         
@@ -77,80 +498,117 @@ class RIFEProcessor:
             scale: Scale factor for processing (1.0=normal, 2.0=high-quality/slow)
             timestep: Time position of interpolated frame (0.5 = middle)
             ensemble: If True, uses Test-Time Augmentation (TTA) by flipping inputs and averaging results (2x slower, better quality)
+            strip_height: If set, process the frame in horizontal strips of about this height to cap VRAM
             
         Returns:
             Interpolated frame as numpy array (H, W, 3) in BGR format
         """
+        return self.process_pair_batch([img0_bgr], [img1_bgr], scale=scale, timestep=timestep,
+                                       ensemble=ensemble, strip_height=strip_height)[0]
+    
+    def process_pair_batch(self, imgs0_bgr, imgs1_bgr, scale=1.0, timestep=0.5, ensemble=False, strip_height=None):
+        """
+        Generate interpolated frames for several frame pairs in a single forward pass
+        
+        Batching keeps the GPU busy instead of paying launch/sync overhead per pair.
+        
+        Args:
+            imgs0_bgr: Sequence of first frames, each (H, W, 3) in BGR format
+            imgs1_bgr: Sequence of second frames, each (H, W, 3) in BGR format
+            scale: Scale factor for processing (1.0=normal, 2.0=high-quality/slow)
+            timestep: Time position of interpolated frames (0.5 = middle)
+            ensemble: If True, uses Test-Time Augmentation (TTA) by flipping inputs and averaging results
+            strip_height: If set, process frames in horizontal strips of about this height to cap VRAM
+            
+        Returns:
+            List of interpolated frames (H, W, 3) in BGR format, one per input pair
+        """
         try:
-            # Get original dimensions
-            h, w = img0_bgr.shape[:2]
-            
-            # Convert BGR to RGB and normalize to [0, 1]
-            img0_rgb = cv2.cvtColor(img0_bgr, cv2.COLOR_BGR2RGB)
-            img1_rgb = cv2.cvtColor(img1_bgr, cv2.COLOR_BGR2RGB)
-            
-            # Convert to tensor [1, 3, H, W]
-            I0 = torch.from_numpy(np.transpose(img0_rgb, (2, 0, 1))).unsqueeze(0).float() / 255.0
-            I1 = torch.from_numpy(np.transpose(img1_rgb, (2, 0, 1))).unsqueeze(0).float() / 255.0
-            
-            # Move to device
-            I0 = I0.to(self.device)
-            I1 = I1.to(self.device)
-            
-            # Use FP16 if enabled
-            if self.fp16:
-                I0 = I0.half()
-                I1 = I1.half()
-            
-            # Pad to multiples of 64 (required by new 5-level architecture)
-            tmp = 64
-            ph = ((h - 1) // tmp + 1) * tmp
-            pw = ((w - 1) // tmp + 1) * tmp
-            padding = (0, pw - w, 0, ph - h)
-            
-            # Use reflection padding to avoid edge artifacts affecting flow
-            I0_padded = F.pad(I0, padding, mode='reflect')
-            I1_padded = F.pad(I1, padding, mode='reflect')
-            
-            # Run inference
-            with torch.no_grad():
-                # Pass timestep directly to the new model
-                middle = self.model.inference(I0_padded, I1_padded, timestep=timestep, scale=scale)
-                
-                # TTA Ensemble: Flip inputs manually, process, then flip output back
-                if ensemble:
-                    # 1. Flip inputs horizontally
-                    I0_flipped = torch.flip(I0_padded, dims=[3])
-                    I1_flipped = torch.flip(I1_padded, dims=[3])
-                    
-                    # 2. Process flipped
-                    middle_flipped = self.model.inference(I0_flipped, I1_flipped, timestep=timestep, scale=scale)
-                    
-                    # 3. Un-flip output
-                    middle_unflipped = torch.flip(middle_flipped, dims=[3])
-                    
-                    # 4. Average results
-                    middle = (middle + middle_unflipped) / 2.0
-
-            # Sync for MPS to prevent "dragging" artifacts on Mac
-            if self.device.type == 'mps':
-                torch.mps.synchronize()
+            # Stack raw uint8 BGR frames and upload them as-is: uint8 is 4x less
+            # host-to-device traffic than float32, and the conversion runs on the device
+            I0 = self._upload_frames(imgs0_bgr, slot=0)
+            I1 = self._upload_frames(imgs1_bgr, slot=1)
             
-            # Unpad to original size
-            middle = middle[:, :, :h, :w]
+            h, w = imgs0_bgr[0].shape[:2]
+            return self._interpolate(I0, I1, h, w, scale, timestep, ensemble, strip_height)
             
-            # Convert back to numpy BGR using high-quality rounding
-            # .round().clamp(0, 255) is much better than .byte() which truncates
-            middle_np = (middle[0].permute(1, 2, 0) * 255.0).cpu().numpy()
-            middle_np = np.round(np.clip(middle_np, 0, 255)).astype(np.uint8)
-            middle_bgr = cv2.cvtColor(middle_np, cv2.COLOR_RGB2BGR)
+        except Exception as e:
+            print(f"[RIFE] ERROR during inference: {e}")
+            raise
+    
+    def process_batch(self, frames_bgr, scale=1.0, timestep=0.5, ensemble=False, strip_height=None):
+        """
+        Interpolate between every pair of consecutive frames in a sequence
+        
+        Equivalent to process_pair_batch(frames[:-1], frames[1:]) but every frame is
+        converted, uploaded and padded once, instead of once as I0 and again as I1.
+        
+        Args:
+            frames_bgr: Sequence of N >= 2 consecutive frames, each (H, W, 3) in BGR format
+            scale: Scale factor for processing (1.0=normal, 2.0=high-quality/slow)
+            timestep: Time position of interpolated frames (0.5 = middle)
+            ensemble: If True, uses Test-Time Augmentation (TTA) by flipping inputs and averaging results
+            strip_height: If set, process frames in horizontal strips of about this height to cap VRAM
+            
+        Returns:
+            List of N-1 interpolated frames (H, W, 3) in BGR format
+        """
+        try:
+            frames = self._upload_frames(frames_bgr)
             
-            return middle_bgr
+            h, w = frames_bgr[0].shape[:2]
+            return self._interpolate(frames[:-1], frames[1:], h, w, scale, timestep, ensemble, strip_height)
             
         except Exception as e:
             print(f"[RIFE] ERROR during inference: {e}")
             raise
+    
+    def _interpolate(self, I0_padded, I1_padded, h, w, scale, timestep, ensemble, strip_height):
+        """
+        Run RIFE on padded input batches and return the unpadded BGR uint8 frames
+        
+        Args:
+            I0_padded, I1_padded: Padded input tensors [B, 3, H, W] in RGB, [0, 1]
+            h, w: Original frame size to crop the output back to
+            
+        Returns:
+            List of interpolated frames (h, w, 3) in BGR format
+        """
+        # Run inference (inference_mode also skips autograd version tracking)
+        autocast = torch.autocast(device_type='cuda', dtype=torch.float16,
+                                  enabled=self.fp16 and self.device.type == 'cuda')
+        if strip_height:
+            infer = lambda a, b: self._inference_strips(a, b, timestep, scale, strip_height)
+        else:
+            infer = lambda a, b: self._inference(a, b, timestep, scale)
+        
+        with torch.inference_mode(), autocast:
+            if not ensemble:
+                # Pass timestep directly to the new model
+                middle = infer(I0_padded, I1_padded)
+            else:
+                # TTA Ensemble: run the inputs and their horizontal flips as one batch of
+                # 2B (a single pass fills the GPU better than two sequential ones),
+                # then un-flip the second half and average
+                b = I0_padded.shape[0]
+                I0_both = torch.cat([I0_padded, torch.flip(I0_padded, dims=[3])], dim=0)
+                I1_both = torch.cat([I1_padded, torch.flip(I1_padded, dims=[3])], dim=0)
+                out = infer(I0_both, I1_both)
+                middle = (out[:b] + torch.flip(out[b:], dims=[3])) / 2.0
 
+        # Sync for MPS to prevent "dragging" artifacts on Mac
+        if self.device.type == 'mps':
+            torch.mps.synchronize()
+        
+        # Unpad to original size
+        middle = middle[:, :, :h, :w]
+        
+        # Quantize on the device with proper rounding (.byte() would truncate),
+        # swap RGB back to BGR and copy uint8 to the host in a single transfer
+        middle_u8 = middle.float().mul(255.0).round_().clamp_(0, 255).to(torch.uint8)
+        middle_np = middle_u8.flip(1).permute(0, 2, 3, 1).contiguous().cpu().numpy()
+        
+        return list(middle_np)
 
 if __name__ == "__main__":
     # Simple test
@@ -0,0 +1,436 @@
+"""
+Video I/O helpers for the streaming pipeline
+Decodes with PyAV (FFmpeg frame/slice threads, optional hardware decode) when it is
+installed, and encodes frames by piping raw BGR bytes into an FFmpeg subprocess, which
+can use hardware encoders (NVENC, VideoToolbox) instead of OpenCV's CPU-only mp4v writer
+"""
+
+import cv2
+import os
+import sys
+import queue
+import platform
+import shutil
+import subprocess
+import tempfile
+import functools
+import threading
+import numpy as np
+import torch
+
+try:
+    # Optional: PyAV decodes with FFmpeg's frame/slice threading, which is much
+    # faster than cv2.VideoCapture's default decoder on long HD clips
+    import av
+except ImportError:
+    av = None
+
+
+# Encoder-specific quality settings (roughly visually lossless)
+CODEC_ARGS = {
+    'h264_nvenc': ['-preset', 'p4', '-cq', '20'],
+    'hevc_nvenc': ['-preset', 'p4', '-cq', '22'],
+    'h264_videotoolbox': ['-q:v', '65', '-allow_sw', '1'],
+    'libx264': ['-preset', 'veryfast', '-crf', '18'],
+}
+
+
+def find_ffmpeg():
+    """Return the path to an ffmpeg binary, or None if none is available"""
+    path = shutil.which('ffmpeg')
+    if path:
+        return path
+    try:
+        # Bundled binary shipped with the imageio-ffmpeg package
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+
+@functools.lru_cache(maxsize=None)
+def available_encoders(ffmpeg):
+    """Return the set of encoder names supported by the given ffmpeg binary"""
+    try:
+        out = subprocess.run(
+            [ffmpeg, '-hide_banner', '-encoders'],
+            capture_output=True, text=True, timeout=10
+        ).stdout
+    except Exception:
+        return frozenset()
+    # Encoder lines look like: " V....D libx264   libx264 H.264 / AVC ..."
+    return frozenset(line.split()[1] for line in out.splitlines() if line.startswith(' V'))
+
+
+@functools.lru_cache(maxsize=None)
+def encoder_works(ffmpeg, codec):
+    """
+    Return True if the encoder can actually encode a frame on this machine
+
+    Hardware encoders are listed by ffmpeg builds that support them even when
+    the driver, GPU or session limit makes them unusable, so encode one frame
+    into the null muxer to find out
+    """
+    if codec not in available_encoders(ffmpeg):
+        return False
+    try:
+        result = subprocess.run(
+            [ffmpeg, '-hide_banner', '-loglevel', 'error',
+             '-f', 'lavfi', '-i', 'color=c=black:s=256x256:d=0.1',
+             '-frames:v', '1', '-c:v', codec, '-pix_fmt', 'yuv420p',
+             '-f', 'null', '-'],
+            capture_output=True, timeout=15
+        )
+    except Exception:
+        return False
+    return result.returncode == 0
+
+
+def _hwaccel_device(hwaccel):
+    # 'auto' picks the platform's hardware decoder: VideoToolbox on macOS, NVDEC on CUDA hosts
+    if hwaccel != 'auto':
+        return hwaccel
+    if sys.platform == 'darwin':
+        return 'videotoolbox'
+    return 'cuda' if torch.cuda.is_available() else None
+
+
+def _open_av(video_path, hwaccel=None):
+    device = _hwaccel_device(hwaccel)
+    if device is not None:
+        try:
+            # PyAV >= 14; falls back to software decode for streams the device can't handle
+            from av.codec.hwaccel import HWAccel
+            return av.open(video_path, hwaccel=HWAccel(device_type=device, allow_software_fallback=True))
+        except Exception as e:
+            print(f"Hardware decode ({device}) unavailable, using software decode: {e}")
+    return av.open(video_path)
+
+
+def open_video(video_path, hwaccel=None, start=0, end=None, stride=1):
+    """
+    Opens a video for decoding, preferring PyAV and falling back to OpenCV.
+    hwaccel: PyAV hardware decoder ('videotoolbox', 'cuda', 'vaapi', ...), 'auto'
+    to pick one for this platform, or None for multi-threaded software decode.
+    start, end, stride: only frames start, start + stride, ... before end are returned.
+    Returns (fps, frame_count, frames) where frames is a generator of BGR arrays,
+    or None if the file cannot be opened.
+    """
+    if hwaccel not in (None, 'auto') and av is None:
+        print("Hardware decode requires PyAV (pip install av), using OpenCV")
+
+    if av is not None:
+        try:
+            container = _open_av(video_path, hwaccel)
+            stream = container.streams.video[0]
+        except Exception:
+            container = None
+        if container is not None:
+            # Let FFmpeg pick frame or slice threading with one thread per core
+            stream.thread_type = 'AUTO'
+            stream.thread_count = 0
+            fps = float(stream.average_rate or 0)
+            return fps, stream.frames, _read_frames_av(container, stream, start, end, stride)
+
+    # FFmpeg's software decoders scale across cores (frame/slice threads); ask for one
+    # decode thread per core explicitly instead of relying on the build's default
+    cap = cv2.VideoCapture(video_path, cv2.CAP_ANY, [cv2.CAP_PROP_N_THREADS, os.cpu_count() or 1])
+    if not cap.isOpened():
+        return None
+
+    # Frames are read strictly in order; a deeper internal queue only costs memory
+    # (ignored by backends without a frame buffer)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    return fps, frame_count, _read_frames(cap, start, end, stride)
+
+
+def _is_selected(index, start, stride):
+    return index >= start and (index - start) % stride == 0
+
+
+def _read_frames(cap, start=0, end=None, stride=1):
+    # grab() only demuxes/decodes; retrieve() adds the YUV -> BGR conversion and
+    # copy, so skipped frames never pay for it
+    try:
+        index = 0
+        while end is None or index < end:
+            if not cap.grab():
+                break
+            if _is_selected(index, start, stride):
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                yield frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def _read_frames_av(container, stream, start=0, end=None, stride=1):
+    # Every frame must be decoded (later frames reference it), but only the
+    # selected ones are converted to BGR arrays
+    try:
+        for index, frame in enumerate(container.decode(stream)):
+            if end is not None and index >= end:
+                break
+            if _is_selected(index, start, stride):
+                yield frame.to_ndarray(format='bgr24')
+    finally:
+        container.close()
+
+
+class FFmpegWriter:
+    """Drop-in replacement for cv2.VideoWriter that pipes frames into ffmpeg"""
+
+    def __init__(self, output_path, fps, frame_size, codec='libx264', ffmpeg=None):
+        """
+        Start an ffmpeg encoder process
+
+        Args:
+            output_path: Destination video file
+            fps: Output frame rate
+            frame_size: (width, height) of the frames that will be written
+            codec: ffmpeg encoder name (e.g. 'h264_nvenc', 'libx264')
+            ffmpeg: Path to the ffmpeg binary (auto-detected if None)
+        """
+        self.codec = codec
+        self.output_path = output_path
+        width, height = frame_size
+        ffmpeg = ffmpeg or find_ffmpeg()
+
+        cmd = [
+            ffmpeg, '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24',
+            '-s', f'{width}x{height}', '-r', str(fps),
+            '-i', '-',
+            '-c:v', codec, *CODEC_ARGS.get(codec, []),
+            '-pix_fmt', 'yuv420p',
+            output_path
+        ]
+        # stderr goes to a file, not a pipe: nothing reads it while encoding, and a
+        # full pipe buffer (e.g. repeated encoder warnings) would stall ffmpeg
+        self._stderr_file = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=self._stderr_file, bufsize=0)
+
+    def isOpened(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def write(self, frame):
+        # Hand ffmpeg the frame's own buffer instead of a tobytes() copy; the pipe is
+        # unbuffered, so loop in case the kernel accepts only part of the frame
+        if not frame.flags['C_CONTIGUOUS']:
+            frame = np.ascontiguousarray(frame)
+        view = memoryview(frame).cast('B')
+        try:
+            while view:
+                view = view[self.proc.stdin.write(view):]
+        except (BrokenPipeError, OSError):
+            raise RuntimeError(f"FFmpeg encoder ({self.codec}) exited: {self._stderr()}")
+
+    def release(self):
+        if self.proc is None:
+            return
+        proc, self.proc = self.proc, None
+        # Closes stdin (EOF ends the encode) and waits for ffmpeg to finish the file
+        proc.communicate()
+        error = self._read_stderr() if proc.returncode != 0 else None
+        self._stderr_file.close()
+        if error is not None:
+            raise RuntimeError(f"FFmpeg encoder ({self.codec}) failed: {error}")
+
+    def _stderr(self):
+        try:
+            self.proc.wait(timeout=5)
+            return self._read_stderr()
+        except Exception:
+            return "unknown error"
+
+    def _read_stderr(self):
+        self._stderr_file.seek(0)
+        return self._stderr_file.read().decode(errors='replace').strip()
+
+
+class FrameReader:
+    """Decodes frames on a background thread so decoding overlaps with inference"""
+
+    def __init__(self, frames, maxsize=8, stop_event=None):
+        """
+        Args:
+            frames: Generator of decoded BGR frames (e.g. from open_video)
+            maxsize: Number of decoded frames buffered ahead of the consumer
+            stop_event: threading.Event that stops decoding when set
+        """
+        self.frames = frames
+        self.stop_event = stop_event
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self._closed = False
+        self._finished = False
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def _worker(self):
+        try:
+            for frame in self.frames:
+                if self._closed or (self.stop_event and self.stop_event.is_set()):
+                    break
+                self._put(frame)
+        except Exception as e:
+            self.error = e
+        finally:
+            # End-of-stream sentinel
+            self._put(None)
+
+    def _put(self, item):
+        # Poll so a released reader never leaves this thread blocked on a full queue
+        while not self._closed:
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def read(self):
+        """Same contract as cv2.VideoCapture.read(): returns (ret, frame)"""
+        if self._finished:
+            return False, None
+        frame = self.queue.get()
+        if frame is None:
+            self._finished = True
+            if self.error is not None:
+                raise self.error
+            return False, None
+        return True, frame
+
+    def release(self):
+        """Stop the decode thread and close the decoder"""
+        if self.thread is None:
+            return
+        self._closed = True
+        self.thread.join()
+        self.thread = None
+        # Runs the generator's cleanup (capture/container release) on this thread
+        self.frames.close()
+
+
+class AsyncFrameWriter:
+    """Writes frames on a background thread so encoder backpressure never stalls inference"""
+
+    def __init__(self, writer, maxsize=64):
+        """
+        Args:
+            writer: Underlying writer (FFmpegWriter or cv2.VideoWriter)
+            maxsize: Maximum number of frames buffered before write() blocks
+        """
+        self.writer = writer
+        self.codec = getattr(writer, 'codec', 'mp4v (OpenCV)')
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self.thread = threading.Thread(target=self._worker, daemon=True)
+        self.thread.start()
+
+    def _worker(self):
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                break
+            # After a failure keep draining so producers never block forever
+            if self.error is None:
+                try:
+                    self.writer.write(frame)
+                except Exception as e:
+                    self.error = e
+
+    def isOpened(self):
+        return self.writer.isOpened()
+
+    def write(self, frame):
+        """Queue a frame for writing, blocking only while the queue is full"""
+        if self.error is not None:
+            raise self.error
+        self.queue.put(frame)
+
+    def try_write(self, frame):
+        """Queue a frame without blocking; the frame is dropped if the queue is full"""
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            return False
+
+    def release(self, drop_pending=False):
+        """
+        Flush the queue, stop the writer thread and release the underlying writer
+
+        Args:
+            drop_pending: If True, discard frames that are still queued (used on cancel)
+        """
+        if self.thread is None:
+            return
+        if drop_pending:
+            try:
+                while True:
+                    self.queue.get_nowait()
+            except queue.Empty:
+                pass
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.writer.release()
+        if self.error is not None:
+            raise self.error
+
+
+def default_codec(ffmpeg):
+    """
+    Pick a hardware H.264 encoder when one is usable, otherwise libx264
+
+    NVENC needs a CUDA GPU; VideoToolbox is used on Apple Silicon, where its
+    constant-quality mode (-q:v) is supported. Hardware encoders are probed
+    with a one-frame test encode before being chosen.
+    """
+    if torch.cuda.is_available() and encoder_works(ffmpeg, 'h264_nvenc'):
+        return 'h264_nvenc'
+    if sys.platform == 'darwin' and platform.machine() == 'arm64' and encoder_works(ffmpeg, 'h264_videotoolbox'):
+        return 'h264_videotoolbox'
+    if 'libx264' in available_encoders(ffmpeg):
+        return 'libx264'
+    return None
+
+
+def open_video_writer(output_path, fps, frame_size, codec=None):
+    """
+    Open the fastest available video writer
+
+    Uses an ffmpeg pipe (NVENC on CUDA hosts, VideoToolbox on Apple Silicon,
+    libx264 otherwise) and falls back to cv2.VideoWriter with mp4v when ffmpeg
+    or a usable H.264 encoder is missing. Encoders are test-encoded once per
+    process, so a listed but broken NVENC does not fail on the first write.
+
+    Args:
+        output_path: Destination video file
+        fps: Output frame rate
+        frame_size: (width, height) of the frames
+        codec: ffmpeg encoder name, or None to auto-select
+
+    Returns:
+        Writer object with write(frame), isOpened() and release()
+    """
+    width, height = frame_size
+    ffmpeg = find_ffmpeg()
+
+    # yuv420p needs even dimensions; keep odd-sized videos on the OpenCV path
+    if ffmpeg and width % 2 == 0 and height % 2 == 0:
+        if codec is not None and not encoder_works(ffmpeg, codec):
+            print(f"[VIDEO] Encoder '{codec}' not usable with this ffmpeg, using auto-selected encoder")
+            codec = None
+        if codec is None:
+            codec = default_codec(ffmpeg)
+        if codec is not None:
+            return FFmpegWriter(output_path, fps, frame_size, codec=codec, ffmpeg=ffmpeg)
+
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    return cv2.VideoWriter(output_path, fourcc, fps, frame_size)
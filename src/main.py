@@ -17,7 +17,7 @@ REPORT_FRAMES_DIR = os.path.join(DATA_DIR, "report_frames")  # For first 20 fram
 RIFE_MODEL_DIR = os.path.join(os.path.dirname(__file__), "engine", "rife")
 
 
-def run_pipeline(video_filename, save_report_frames=True, scale=1.0):
+def run_pipeline(video_filename, save_report_frames=True, scale=1.0, static_threshold=0, batch_size=8):
     """
     RIFE Interpolation Pipeline with Streaming Assembly
     
@@ -25,6 +25,11 @@ def run_pipeline(video_filename, save_report_frames=True, scale=1.0):
         video_filename: Name of video file in the project root
         save_report_frames: If True, saves first 20 frames as PNGs for reporting
         scale: RIFE scale factor (1.0 = normal, 2.0 = high quality for fast motion)
+        static_threshold: Opt-in static-scene gate: largest block difference (0-255)
+            below which a frame pair is blended instead of interpolated by RIFE
+            (0, the default, = always run RIFE)
+        batch_size: Maximum number of frame pairs per forward pass (deeper 4x/8x tree
+            levels are split into passes of this size)
     """
     start_time = time.time()
     
@@ -75,6 +80,8 @@ def run_pipeline(video_filename, save_report_frames=True, scale=1.0):
             processor=processor,
             target_fps_multiplier=2,
             scale=scale,
+            static_threshold=static_threshold,
+            batch_size=batch_size,
             save_png_count=20 if save_report_frames else 0,
             png_output_dir=REPORT_FRAMES_DIR if save_report_frames else None
         )
@@ -90,6 +97,7 @@ def run_pipeline(video_filename, save_report_frames=True, scale=1.0):
         print(f"  📊 Input Frames:  {stats['input_frames']}")
         print(f"  📊 Output Frames: {stats['output_frames']}")
         print(f"  📊 Interpolated:  {stats['interpolated_frames']}")
+        print(f"  📊 Static (blended): {stats['frames_skipped_static']}")
         print(f"  🎬 Input FPS:  {stats['input_fps']:.2f}")
         print(f"  🎬 Output FPS: {stats['output_fps']:.2f}")
         
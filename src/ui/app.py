@@ -1,6 +1,7 @@
 import os
 import sys
 import threading
+import collections
 import customtkinter as ctk
 from tkinter import filedialog
 from PIL import Image
@@ -15,21 +16,64 @@ from engine.interpolation import process_video_streaming
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
+# One processor per process: weights load (and the model compiles) once, even if
+# several app windows are created or a run is stopped and restarted
+_PROCESSOR_SINGLETON = None
+_PROCESSOR_LOCK = threading.Lock()
+
+def get_processor(model_dir):
+    """Returns the shared RIFEProcessor, creating it on first use"""
+    global _PROCESSOR_SINGLETON
+    with _PROCESSOR_LOCK:
+        if _PROCESSOR_SINGLETON is None:
+            print("--- [UI] INITIALIZING RIFE AI MODEL ---")
+            # torch.compile stays off: each run executes on a fresh worker thread, and
+            # reuse of reduce-overhead CUDA graph state across runs is unverified
+            _PROCESSOR_SINGLETON = RIFEProcessor(model_dir=model_dir)
+        return _PROCESSOR_SINGLETON
+
 class TextRedirector:
     """Helper to redirect stdout/stderr to a text widget in the UI"""
+    FLUSH_INTERVAL_MS = 100
+    POLL_INTERVAL_MS = 20
+
     def __init__(self, widget):
         self.widget = widget
+        # Writes only append to a buffer (safe from the worker thread); the Tk main
+        # loop drains it into the widget on a fixed tick, in one insert per tick
+        self._buffer = collections.deque()
+        self._lock = threading.Lock()
+        # Set by flush(); the main loop polls it, so the worker never makes a Tk call
+        self._flush_requested = threading.Event()
+        self._ticks = 0
+        self.widget.after(self.POLL_INTERVAL_MS, self._drain)
 
     def write(self, str):
-        self.widget.configure(state="normal")
-        self.widget.insert("end", str)
-        self.widget.see("end")
-        self.widget.configure(state="disabled")
+        with self._lock:
+            self._buffer.append(str)
 
     def flush(self):
-        pass
+        # Ask the main loop to show buffered text on its next poll instead of the next tick
+        self._flush_requested.set()
+
+    def _drain(self):
+        self._ticks += 1
+        if self._flush_requested.is_set() or self._ticks * self.POLL_INTERVAL_MS >= self.FLUSH_INTERVAL_MS:
+            self._flush_requested.clear()
+            self._ticks = 0
+            with self._lock:
+                text = "".join(self._buffer)
+                self._buffer.clear()
+            if text:
+                self.widget.configure(state="normal")
+                self.widget.insert("end", text)
+                self.widget.see("end")
+                self.widget.configure(state="disabled")
+        self.widget.after(self.POLL_INTERVAL_MS, self._drain)
 
 class SlowmoApp(ctk.CTk):
+    PROGRESS_INTERVAL_MS = 50
+
     def __init__(self):
         super().__init__()
 
@@ -115,6 +159,12 @@ class SlowmoApp(ctk.CTk):
             text_color="gray"
         ).pack(pady=(0, 10))
 
+        # 6. Batch Size (upper bound on frame pairs per forward pass, at every multiplier)
+        ctk.CTkLabel(self.sidebar_frame, text="Batch Size (max pairs per pass)").pack()
+        self.batch_var = ctk.StringVar(value="8")
+        self.batch_menu = ctk.CTkComboBox(self.sidebar_frame, values=["1", "2", "4", "8", "16"], variable=self.batch_var)
+        self.batch_menu.pack(padx=20, pady=10)
+
         # --- MAIN CONTENT AREA ---
         self.main_frame = ctk.CTkFrame(self)
         self.main_frame.grid(row=0, column=1, sticky="nsew", padx=10, pady=10)
@@ -154,6 +204,11 @@ class SlowmoApp(ctk.CTk):
         # Thread control
         self.stop_event = threading.Event()
 
+        # Progress reported by the worker thread; the Tk loop applies it on a timer
+        self._progress_value = 0.0
+        self._progress_shown = 0.0
+        self.after(self.PROGRESS_INTERVAL_MS, self._poll_progress)
+
     def open_file(self):
         filename = filedialog.askopenfilename(title="Select Video", filetypes=[("Video files", "*.mp4 *.mov *.avi")])
         if filename:
@@ -161,8 +216,19 @@ class SlowmoApp(ctk.CTk):
             self.file_label.configure(text=f"Selected: {os.path.basename(filename)}")
     
     def update_progress(self, value):
-        self.progressbar.set(value)
-        self.prog_label.configure(text=f"Processing: {int(value * 100)}%")
+        # Called from the worker thread after every pair: only record the value,
+        # never touch Tk widgets here
+        self._progress_value = value
+
+    def _poll_progress(self):
+        # Coalesces updates: redraw at most every PROGRESS_INTERVAL_MS, and only for
+        # changes of at least half a percent (or reaching 100%)
+        value = self._progress_value
+        if value != self._progress_shown and (abs(value - self._progress_shown) >= 0.005 or value >= 1.0):
+            self._progress_shown = value
+            self.progressbar.set(value)
+            self.prog_label.configure(text=f"Processing: {int(value * 100)}%")
+        self.after(self.PROGRESS_INTERVAL_MS, self._poll_progress)
 
     def start_processing_thread(self):
         if not self.input_video_path.get():
@@ -179,6 +245,7 @@ class SlowmoApp(ctk.CTk):
         self.multiplier_menu.configure(state="disabled")
         self.scale_menu.configure(state="disabled")
         self.ensemble_switch.configure(state="disabled")
+        self.batch_menu.configure(state="disabled")
 
         # Start heavy lifting in a separate thread
         thread = threading.Thread(target=self.run_inference)
@@ -195,9 +262,8 @@ class SlowmoApp(ctk.CTk):
         try:
             # 1. Init model if not exists
             if self.processor is None:
-                print("--- [UI] INITIALIZING RIFE AI MODEL ---")
                 model_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "engine", "rife")
-                self.processor = RIFEProcessor(model_dir=model_dir)
+                self.processor = get_processor(model_dir)
 
             # 2. Run Processing
             input_path = self.input_video_path.get()
@@ -217,6 +283,7 @@ class SlowmoApp(ctk.CTk):
             multiplier = int(self.multiplier_var.get())
             playback_fps = float(self.fps_slider.get())
             ensemble_enabled = (self.ensemble_var.get() == "on")
+            batch_size = max(1, int(self.batch_var.get()))
             
             # Parse scale value
             scale_str = self.scale_var.get()
@@ -239,6 +306,8 @@ class SlowmoApp(ctk.CTk):
                 output_fps=playback_fps,
                 scale=scale,
                 ensemble=ensemble_enabled,
+                batch_size=batch_size,
+                static_threshold=0,  # Blend gate stays off: every pair goes through RIFE
                 stop_event=self.stop_event,
                 progress_callback=self.update_progress,
                 save_png_count=20,
@@ -261,6 +330,7 @@ class SlowmoApp(ctk.CTk):
             self.multiplier_menu.configure(state="normal")
             self.scale_menu.configure(state="normal")
             self.ensemble_switch.configure(state="normal")
+            self.batch_menu.configure(state="normal")
 
 if __name__ == "__main__":
     app = SlowmoApp()
@@ -1,32 +1,89 @@
 import torch
 import cv2
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
-def load_image_as_tensor(image_path):
-    """Loads an image from disk and converts it to a PyTorch Tensor."""
-    # Read image using OpenCV (BGR format)
+def _read_bgr(image_path):
+    """Reads an image from disk as a BGR uint8 array (OpenCV's native order)."""
     img = cv2.imread(image_path)
     if img is None:
         raise FileNotFoundError(f"Could not load image at {image_path}")
+    return img
+
+def _to_float_nchw(batch, device=None, pin_memory=None, channels_last=False):
+    """
+    Turns a (N, H, W, C) uint8 BGR tensor into a (N, C, H, W) RGB float tensor in [0, 1].
+    
+    With a device, the uint8 pixels are uploaded as-is (a quarter of the FP32 bytes)
+    and the channel swap, cast, scaling and layout change run on the device.
+    """
+    if pin_memory is None:
+        pin_memory = torch.cuda.is_available()
+    
+    if device is not None and torch.device(device).type != 'cpu':
+        if pin_memory:
+            batch = batch.pin_memory()
+        batch = batch.to(device, non_blocking=True)
+        pin_memory = False
+    
+    # BGR -> RGB on the uint8 tensor instead of a cv2.cvtColor pass per image
+    batch = batch.flip(3).permute(0, 3, 1, 2)
+    if channels_last:
+        # The NHWC uint8 data already has channels-last strides; keep them through the cast
+        batch = batch.to(torch.float32, memory_format=torch.channels_last)
+    else:
+        batch = batch.float()
+    batch = batch.div_(255.0)
+    
+    if pin_memory:
+        batch = batch.pin_memory()
+    return batch
+
+def load_image_as_tensor(image_path, pin_memory=None, device=None, channels_last=False):
+    """
+    Loads an image from disk and converts it to a PyTorch Tensor.
     
-    # Convert BGR to RGB
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    Without a device, the tensor stays on the CPU and is returned in page-locked
+    (pinned) memory when CUDA is available, so a later .to('cuda', non_blocking=True)
+    runs as an async DMA. With a device, the uint8 image is uploaded and converted there.
+    """
+    img = _read_bgr(image_path)
     
-    # Convert to Tensor: (H, W, C) -> (C, H, W) and normalize to [0, 1]
-    img_tensor = torch.from_numpy(img).permute(2, 0, 1).float() / 255.0
-    return img_tensor.unsqueeze(0)  # Add batch dimension: (1, C, H, W)
+    # Zero-copy view of the decoded pixels: (1, H, W, C) uint8
+    img_tensor = torch.from_numpy(img).unsqueeze(0)
+    return _to_float_nchw(img_tensor, device, pin_memory, channels_last)  # (1, C, H, W)
+
+def load_image_as_tensor_batch(image_paths, pin_memory=None, max_workers=4, device=None, channels_last=False):
+    """
+    Loads several same-sized images into a single (N, C, H, W) tensor.
+    
+    Images are decoded on a thread pool (OpenCV releases the GIL while decoding),
+    stacked into one uint8 buffer and converted (or uploaded) once.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        images = list(pool.map(_read_bgr, image_paths))
+    
+    return _to_float_nchw(torch.from_numpy(np.stack(images)), device, pin_memory, channels_last)
 
 def save_tensor_as_image(tensor, output_path):
     """Converts a PyTorch Tensor back to an image and saves it to disk."""
-    # Remove batch dimension and move to CPU
-    img = tensor.squeeze().cpu().numpy()
+    save_tensor_batch_as_images(tensor.reshape((1,) + tensor.shape[-3:]), [output_path])
+
+def save_tensor_batch_as_images(tensor_nchw, output_paths, png_compression=None):
+    """
+    Saves a (N, C, H, W) RGB tensor in [0, 1] as N images.
     
-    # (C, H, W) -> (H, W, C)
-    img = np.transpose(img, (1, 2, 0))
+    Scaling, rounding, the uint8 cast and the RGB -> BGR swap all run on the tensor's
+    device, followed by a single uint8 copy to the host for the whole batch.
     
-    # Clip values to [0, 1] and scale to [0, 255]
-    img = np.clip(img * 255.0, 0, 255).astype(np.uint8)
+    Args:
+        tensor_nchw: Batch of RGB images, values in [0, 1]
+        output_paths: One destination path per image
+        png_compression: Optional zlib level (0-9) for PNG outputs; 1 is much faster to encode
+    """
+    images = (tensor_nchw.detach().float().mul(255.0).round_().clamp_(0, 255).to(torch.uint8)
+              .flip(1).permute(0, 2, 3, 1).contiguous().cpu().numpy())
     
-    # Convert RGB back to BGR for OpenCV saving
-    img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-    cv2.imwrite(output_path, img)
\ No newline at end of file
+    params = [cv2.IMWRITE_PNG_COMPRESSION, png_compression] if png_compression is not None else []
+    for img, output_path in zip(images, output_paths):
+        cv2.imwrite(output_path, img, params)
\ No newline at end of file
@@ -1,81 +1,384 @@
 import cv2
 import os
+import sys
+import json
+import queue
+import threading
+import collections
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
 
-def extract_frames(video_path, output_folder):
+# Add the src directory to sys.path to import engine modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.video_io import AsyncFrameWriter, open_video, open_video_writer
+
+try:
+    # Optional: fast lossless compression for the "lz4" frame cache format
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+# Frame files combine_frames_to_video picks up (extract_frames writes any of them)
+FRAME_EXTENSIONS = (".png", ".jpg", ".lz4")
+
+# Sidecar extract_frames writes next to the frames: fps, width, height, frame_count
+META_FILENAME = "meta.json"
+
+
+def _selected_count(frame_count, start, end, stride):
+    # Expected number of frames start/end/stride select (None if the count is unknown)
+    if frame_count <= 0:
+        return None
+    return len(range(start, frame_count if end is None else min(end, frame_count), stride))
+
+
+def iter_frames(video_path, hwaccel=None, start=0, end=None, stride=1):
+    """
+    Yields every decoded BGR frame of a video without touching the disk.
+    Use this instead of extract_frames when the frames are consumed in-process
+    (e.g. fed straight to the interpolator): it skips the PNG encode/decode entirely.
+    hwaccel selects a PyAV hardware decoder; start/end/stride select a subset of
+    frames (see open_video).
+    """
+    opened = open_video(video_path, hwaccel, start, end, stride)
+
+    if opened is None:
+        print(f"Error: Could not open the video file at {video_path}")
+        return
+
+    yield from opened[2]
+
+
+def extract_frames(video_path, output_folder, png_compression=1, hwaccel=None, image_format="png",
+                   start=0, end=None, stride=1):
     #Extracts every frame from a video file and saves them as PNGs.
     #Returns the original FPS of the video.
+    #Only needed when frames must exist on disk; prefer iter_frames otherwise.
+    #png_compression: zlib level 0-9. The frames are scratch data, so the default
+    #level 1 trades slightly larger files for a several times faster encode.
+    #image_format: "png" (lossless), "jpg" (quality 95: faster and ~10x smaller,
+    #for scratch frames that are only re-encoded into a video) or "lz4" (lossless raw
+    #cache, needs the lz4 package: an order of magnitude faster than PNG both ways)
+    #hwaccel: PyAV hardware decoder ('videotoolbox', 'cuda', 'auto', ...), None = software
+    #start, end, stride: save only every stride-th frame of [start, end); skipped frames
+    #are grabbed but never converted. Saved frames are numbered consecutively.
     
-    cap = cv2.VideoCapture(video_path)
+    if image_format == "jpg":
+        write_params = [cv2.IMWRITE_JPEG_QUALITY, 95, cv2.IMWRITE_JPEG_OPTIMIZE, 0]
+    elif image_format == "png":
+        write_params = [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+    elif image_format == "lz4":
+        if lz4_frame is None:
+            raise ImportError("image_format 'lz4' requires the lz4 package (pip install lz4)")
+    else:
+        raise ValueError(f"Unsupported image_format '{image_format}' (expected 'png', 'jpg' or 'lz4')")
+    write_image = _write_lz4 if image_format == "lz4" else lambda path, frame: cv2.imwrite(path, frame, write_params)
+
+    opened = open_video(video_path, hwaccel, start, end, stride)
 
-    if not cap.isOpened():
+    if opened is None:
         print(f"Error: Could not open the video file at {video_path}")
         return 0
 
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps, frame_count, frames = opened
     
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
 
     print(f"VIDEO INFO: {fps} FPS; {frame_count} Frames.")
 
+    # Three stages overlap: decode (reader thread), image encode (writer pool, OpenCV
+    # releases the GIL) and this loop handing frames from one to the other.
+    # Threads rather than processes: imwrite releases the GIL for the whole encode,
+    # so threads scale with cores without pickling every frame to a worker process
+    max_workers = os.cpu_count() or 4
+    # Save each frame with 4-digit padding (frame_0000.png); the folder is joined once
+    name_prefix = os.path.join(output_folder, "frame_")
     count = 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        # Save each frame with 4-digit padding (frame_0000.png)
-        frame_name = os.path.join(output_folder, f"frame_{count:04d}.png")
-        cv2.imwrite(frame_name, frame)
-        count += 1
+    frame_shape = None
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = collections.deque()
+        # tqdm redraws at most every 0.1 s, so the bar costs nothing per frame
+        progress = tqdm(_prefetch(frames), total=_selected_count(frame_count, start, end, stride),
+                        desc="Extracting", unit="frame", mininterval=0.1)
+        for frame in progress:
+            frame_shape = frame.shape
+            pending.append(pool.submit(write_image, f"{name_prefix}{count:04d}.{image_format}", frame))
+            count += 1
+
+            # Bound the number of frames waiting to be encoded
+            if len(pending) >= 2 * max_workers:
+                pending.popleft().result()
+        while pending:
+            pending.popleft().result()
+
+    # Sidecar so combine_frames_to_video knows the frame size without decoding a frame
+    if frame_shape is not None:
+        with open(os.path.join(output_folder, META_FILENAME), "w") as f:
+            json.dump({"fps": fps, "width": frame_shape[1], "height": frame_shape[0],
+                       "frame_count": count, "image_format": image_format}, f)
 
-    cap.release()
     print(f"Success: {count} frames saved to {output_folder}")
     return fps
 
 
+def extract_frames_to_memmap(video_path, cache_path, hwaccel=None):
+    """
+    Decodes every frame of a video into one raw (N, H, W, 3) uint8 memmap file.
+    An uncompressed alternative to extract_frames when frames must be cached on disk:
+    writing is a memory copy instead of a PNG encode, and reading back is slicing.
+    The result can be passed straight to write_frames_to_video.
+    hwaccel selects a PyAV hardware decoder (see open_video).
+    Returns (frames, fps); frames is None if the video cannot be opened.
+    """
+    opened = open_video(video_path, hwaccel)
+
+    if opened is None:
+        print(f"Error: Could not open the video file at {video_path}")
+        return None, 0
+
+    fps, frame_count, frames = opened
+    print(f"VIDEO INFO: {fps} FPS; {frame_count} Frames.")
+
+    cache = None
+    count = 0
+    for frame in tqdm(_prefetch(frames), total=frame_count or None, desc="Caching", unit="frame", mininterval=0.1):
+        if cache is None:
+            cache = np.memmap(cache_path, dtype=np.uint8, mode='w+', shape=(max(frame_count, 1),) + frame.shape)
+        elif count == len(cache):
+            # Container frame counts are estimates; grow the file when it is exceeded
+            cache.flush()
+            shape = (2 * len(cache),) + cache.shape[1:]
+            del cache
+            with open(cache_path, 'r+b') as f:
+                f.truncate(int(np.prod(shape)))
+            cache = np.memmap(cache_path, dtype=np.uint8, mode='r+', shape=shape)
+        cache[count] = frame
+        count += 1
+
+    if cache is None:
+        print(f"Error: No frames decoded from {video_path}")
+        return None, fps
+
+    cache.flush()
+    print(f"Success: {count} frames cached to {cache_path}")
+    return cache[:count], fps
+
+
+def _prefetch(frames, maxsize=8):
+    # Runs an iterator (e.g. the decoder) on a background thread, up to maxsize
+    # items ahead of the consumer; errors are re-raised in the consumer
+    items = queue.Queue(maxsize=maxsize)
+    closed = threading.Event()
+    end = object()
+    errors = []
+
+    def put(item):
+        # Poll so an abandoned consumer never leaves this thread blocked on a full queue
+        while not closed.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def worker():
+        try:
+            for item in frames:
+                if not put(item):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            put(end)
+
+    thread = threading.Thread(target=worker, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is end:
+                break
+            yield item
+        if errors:
+            raise errors[0]
+    finally:
+        closed.set()
+        thread.join()
+
+
+def _read_meta(folder):
+    # Metadata written by extract_frames, or None if missing/unreadable
+    try:
+        with open(os.path.join(folder, META_FILENAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _frame_sort_key(path):
+    # Numeric suffix of "frame_0042.png"; names without one sort by name after numbered frames
+    stem = os.path.splitext(os.path.basename(path))[0]
+    digits = stem[len(stem.rstrip("0123456789")):]
+    return (0, int(digits), stem) if digits else (1, 0, stem)
+
+
+def _write_lz4(path, frame):
+    # Planar (channel-major) layout is a cheap byte shuffle: runs of same-channel
+    # bytes compress better than interleaved BGR
+    planar = np.ascontiguousarray(frame.transpose(2, 0, 1))
+    with open(path, "wb") as f:
+        f.write(lz4_frame.compress(planar, compression_level=0))
+    return True
+
+
+def _read_lz4(path, shape):
+    height, width, channels = shape
+    with open(path, "rb") as f:
+        planar = np.frombuffer(lz4_frame.decompress(f.read()), dtype=np.uint8)
+    return np.ascontiguousarray(planar.reshape(channels, height, width).transpose(1, 2, 0))
+
+
+def _read_frame(path, size=None):
+    if path.endswith(".lz4"):
+        # Raw frames carry no header; combine passes the size from meta.json
+        return _read_lz4(path, (size[1], size[0], 3))
+    frame = cv2.imread(path)
+
+    # Safety Resize: Ensures every frame matches the video container size
+    # (area averaging to shrink, bilinear to enlarge: far cheaper than Lanczos' 8x8 taps)
+    if frame is not None and size is not None and frame.shape[:2] != (size[1], size[0]):
+        shrink = frame.shape[1] > size[0] or frame.shape[0] > size[1]
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA if shrink else cv2.INTER_LINEAR)
+    return frame
+
+
+def _imread_ahead(paths, size=None, max_workers=None, read_ahead=16):
+    # Decodes images on a thread pool (OpenCV releases the GIL while decoding)
+    # while yielding them in order; at most read_ahead frames are held in memory.
+    # Frames are resized to size (width, height) by the workers when they differ.
+    max_workers = max_workers or os.cpu_count() or 4
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = collections.deque()
+        for path in paths:
+            pending.append(pool.submit(_read_frame, path, size))
+            if len(pending) >= read_ahead:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
 def combine_frames_to_video(input_folder, output_video_path, fps):
     """
-    Compiles PNG images into a video.
+    Compiles PNG (or JPEG) images into a video.
     Uses target_fps = fps to ensure a smooth slow-motion effect.
+    Legacy: the main pipeline (process_video_streaming) decodes, interpolates and
+    encodes in a single pass and never writes intermediate PNGs.
     """
     if not os.path.exists(input_folder):
         print(f"Error: Folder {input_folder} does not exist.")
         return
 
-    # Sort images alphabetically to maintain temporal order
-    images = sorted([img for img in os.listdir(input_folder) if img.endswith(".png")])
+    # One directory pass; DirEntry.path avoids re-joining every name
+    with os.scandir(input_folder) as it:
+        images = [entry.path for entry in it if entry.name.endswith(FRAME_EXTENSIONS)]
 
     if not images:
         print(f"Error: No images found in {input_folder}")
         return
 
-    # Get dimensions from the first frame
-    first_frame = cv2.imread(os.path.join(input_folder, images[0]))
-    height, width, _ = first_frame.shape
+    # Sort by frame number to maintain temporal order (frame_9999 < frame_10000)
+    images.sort(key=_frame_sort_key)
+
+    # Get dimensions from the extract_frames sidecar if it matches the folder,
+    # otherwise from the first frame
+    meta = _read_meta(input_folder)
+    if meta is not None and meta.get("frame_count") == len(images):
+        width, height = meta["width"], meta["height"]
+    elif images[0].endswith(".lz4"):
+        print(f"Error: {META_FILENAME} in {input_folder} is missing or does not match its lz4 frames")
+        return
+    else:
+        first_frame = cv2.imread(images[0])
+        height, width, _ = first_frame.shape
     
     #Change this parameter to adjust fps of output video
     target_fps = fps 
     
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v') 
-    video = cv2.VideoWriter(output_video_path, fourcc, target_fps, (width, height))
-
     print(f"Rebuilding Video: {len(images)} frames at {target_fps} FPS...")
 
-    for img_name in images:
-        frame = cv2.imread(os.path.join(input_folder, img_name))
-        if frame is None:
-            continue
+    # Decoding (and any safety resize) of the next frames overlaps with encoding
+    # the current one, so the writer loop only writes
+    frames = tqdm(_imread_ahead(images, size=(width, height)), total=len(images),
+                  desc="Encoding", unit="frame", mininterval=0.1)
+    write_frames_to_video(frames, output_video_path, target_fps)
+    print(f"Success! Final video compiled at: {output_video_path}")
 
-        # Safety Resize: Ensures every frame matches the video container size
-        if (frame.shape[1] != width) or (frame.shape[0] != height):
-            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_LANCZOS4)
 
-        video.write(frame)
+def write_frames_to_video(frames, output_video_path, fps):
+    """
+    Encodes an iterable of same-sized BGR uint8 frames into a video.
+    Frames produced in-process (e.g. by iter_frames or the interpolator) go straight
+    to one persistent writer, with no PNG encode/decode in between.
+    Returns the number of frames written.
+    """
+    video = None
+    count = 0
+    try:
+        for frame in frames:
+            if frame is None:
+                continue
+            if video is None:
+                # ffmpeg pipe (NVENC or multithreaded libx264), mp4v only when ffmpeg is unavailable
+                height, width = frame.shape[:2]
+                # Writes run on their own thread, overlapping with producing the next frames
+                video = AsyncFrameWriter(open_video_writer(output_video_path, fps, (width, height)))
+                print(f"Encoder: {video.codec}")
+            video.write(frame)
+            count += 1
+    finally:
+        if video is not None:
+            video.release()
+    return count
 
-    video.release()
-    print(f"Success! Final video compiled at: {output_video_path}")
+
+
+def stream_process(src, dst, callback, out_fps=None, hwaccel=None):
+    """
+    Decodes src, passes every frame through callback and encodes the results to dst.
+    One decoder feeds one writer, with no intermediate folder or image codec.
+    callback(frame) returns an output frame, a list of frames (e.g. the frame plus
+    interpolated ones), or None to drop it. out_fps defaults to the source frame rate.
+    Returns the number of frames written.
+    """
+    opened = open_video(src, hwaccel)
+
+    if opened is None:
+        print(f"Error: Could not open the video file at {src}")
+        return 0
+
+    fps, frame_count, frames = opened
+    print(f"VIDEO INFO: {fps} FPS; {frame_count} Frames.")
+
+    def outputs():
+        # Decode runs ahead on the prefetch thread and writes drain on the writer
+        # thread, so this loop only runs the callback
+        for frame in tqdm(_prefetch(frames), total=frame_count or None, desc="Processing", unit="frame", mininterval=0.1):
+            result = callback(frame)
+            if result is None:
+                continue
+            if isinstance(result, np.ndarray):
+                yield result
+            else:
+                yield from result
+
+    count = write_frames_to_video(outputs(), dst, out_fps or fps)
+    print(f"Success! {count} frames written to {dst}")
+    return count
 
 
 if __name__ == "__main__":